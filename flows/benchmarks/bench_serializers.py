@@ -0,0 +1,105 @@
+# Benchmark for the CSV serializers
+# Builds a representative artifact for every family and times both writers; the byte for byte parity with to_csv is
+# tests/test_serializers.py. Run from the flows directory: python -m benchmarks.bench_serializers
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_term_limits import synthetic_leaders
+from domain.elections.parliament_charts import parliament_charts
+from domain.elections.results_engine import presidential_results_by_year
+from domain.elections.schemas import apply_schemas
+from domain.elections.serializers import fast_csv_bytes, pandas_csv_bytes
+from domain.elections.term_limits import process_term_limits
+
+DEMOCRACY = 'Democracy &#9432; >>EIU Democracy Index, 2024<br><br>“full democracy”, “flawed democracy”'
+
+
+def family_artifacts(seed=0):
+    # {family: [(artifact, header)]}, with the quoting, unicode, missing values and dtypes each family produces
+    rng = np.random.default_rng(seed)
+    countries = [f'Country {i}' for i in range(54)]
+    parties = ['Party A', 'Party B', 'Party, C', 'Other Parties']
+
+    trackers = pd.DataFrame({
+        'Country': pd.Categorical(rng.choice(countries, 80)),
+        'Elections': pd.Categorical(rng.choice(['Presidential', 'Legislative', 'General'], 80)),
+        'Date': rng.choice(['Jan 2026*', '12 Dec 2026', None], 80),
+        DEMOCRACY: rng.choice(['Hybrid regime', 'Authoritarian', np.nan], 80),
+        "What's at Stake": rng.choice(["A \"close\" race <br><br><a href='x'><b>View profile ➜</b></a>",
+                                       'Line one\nline two', '-'], 80),
+    })
+    points = pd.DataFrame({
+        'Longitude': rng.uniform(-20, 50, 40).round(4), 'Latitude': rng.uniform(-35, 35, 40),
+        'Country': rng.choice(countries, 40), 'Type': rng.choice(['Key race to watch', 'Other election'], 40),
+        'Profile': rng.choice(['https://example.com/a', np.nan], 40), 'Elections': rng.choice(['Presidential'], 40),
+    })
+    maps = pd.DataFrame({'Country': pd.Categorical(countries),
+                         'GDP': pd.array(rng.integers(10 ** 9, 10 ** 12, 54), dtype='Int64')})
+    maps.loc[3, 'GDP'] = pd.NA
+    key_stats = pd.DataFrame({'Attribute': ['<b>Population</b>', '<b>GDP</b>', DEMOCRACY],
+                              'Value': ['33.5mn', '$76.4bn', np.nan]})
+    candidates = pd.DataFrame({
+        'Name': ['Ama Mensah', 'John, Jr.', 'Zoë'], 'Coalition': ['', 'NDC', 'NPP'],
+        'Text': ['<b>Gender:</b> Female<br> <b>Party:</b> "A"', 'x', 'y'], 'Winner': pd.Categorical(['Yes', 'No', 'No']),
+    })
+    totals = pd.DataFrame({'Source': 's', 'Country': 'Ghana', 'Year': [2016, 2020, 2024, 2028],
+                           'Winning Party': ['Party A', 'Party B', 'Party A', 'Not available']})
+    for party in parties:
+        totals[party] = rng.integers(0, 10 ** 6, 4).astype(float)
+    totals.loc[1, 'Party, C'] = np.nan
+    bar_charts = [chart for _, chart in presidential_results_by_year(apply_schemas({'Pres-Results-Total': totals})[
+        'Pres-Results-Total'])]
+    subnational = pd.DataFrame({'Year': np.repeat([2016, 2020], 16), 'Region': [f'Region {i}' for i in range(32)],
+                                'Party A': rng.integers(0, 10 ** 5, 32).astype(float)})
+    subnational.loc[5, 'Party A'] = np.nan
+    subnational = apply_schemas({'Pres-Results-Subnational': subnational.assign(Source='s', Country='Ghana')[
+        ['Source', 'Country', 'Year', 'Region', 'Party A']]})['Pres-Results-Subnational']
+    results_maps = [year_df.drop(columns=['Year']) for _, year_df in subnational.iloc[:, 2:].groupby('Year')]
+    legislative = pd.DataFrame({'Source': 's', 'Country': 'Ghana', 'Year': [2020, 2020, 2024],
+                                'Parliament Type': ['Upper', 'Lower', 'Unicameral'], 'Party A': [10.0, np.nan, 80],
+                                'Other Parties': [1, 2, 3], 'Vacant': [0, 0, 1]})
+    parliament = [chart for _, _, chart in parliament_charts(apply_schemas({'Legislative-Control': legislative})[
+        'Legislative-Control'])]
+    voter_metrics = pd.DataFrame({'Country': 'Ghana', 'Year': [2016, 2020], 'Turnout': [68.62, np.nan],
+                                  'Registered voters': [15712499, 17027941]})
+    resources = pd.DataFrame({'Name': ['Observer, Group', 'CODEO'], 'Website': ['https://a.org', np.nan]})
+    representativeness = pd.DataFrame({'Country': ['Ghana', 'Kenya'], 'Year': [2020, 2022],
+                                       'PVT: Was the winning party the same?': ['Yes', None]})
+    term_limits = process_term_limits(synthetic_leaders(1, 54, seed=seed))
+
+    return {
+        'trackers': [(trackers, True)],
+        'points': [(points, True)],
+        'maps': [(maps, True)],
+        'key-stats': [(key_stats, False)],
+        'candidates': [(candidates, True)],
+        'bar-charts': [(chart, True) for chart in bar_charts],
+        'results-maps': [(year_df, True) for year_df in results_maps],
+        'parliament': [(chart, True) for chart in parliament],
+        'voter-metrics': [(voter_metrics, True)],
+        'resources': [(resources, True)],
+        'representativeness': [(representativeness, True)],
+        'term-limits': [(term_limits, True)],
+    }
+
+
+def best_of(fn, artifacts, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for df, header in artifacts:
+            fn(df, header=header)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    artifacts = family_artifacts()
+    print(f"{'family':>20} {'artifacts':>10} {'pandas (ms)':>12} {'fast (ms)':>10} {'speedup':>8}")
+    for family, family_frames in artifacts.items():
+        pandas_time = best_of(pandas_csv_bytes, family_frames)
+        fast_time = best_of(fast_csv_bytes, family_frames)
+        print(f'{family:>20} {len(family_frames):>10} {pandas_time * 1000:>12.3f} {fast_time * 1000:>10.3f} '
+              f'{pandas_time / fast_time:>7.1f}x')
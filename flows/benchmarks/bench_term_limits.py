@@ -0,0 +1,103 @@
+# Benchmark the term-limits transform on a synthetic multi-region, multi-century leaders table
+# Run from the flows directory: python -m benchmarks.bench_term_limits
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from domain.elections.term_limits import process_term_limits
+
+SIZES = [(1, 54), (5, 60), (20, 100)]  # (regions, countries per region)
+
+
+def synthetic_leaders(regions, countries_per_region, seed=0):
+    # every country gets a chain of leaders from 1800 to today, the last one incumbent
+    rng = np.random.default_rng(seed)
+    rows = []
+    for region in range(regions):
+        for country in range(countries_per_region):
+            year = 1800 + int(rng.integers(0, 150))
+            leader = 0
+            while year < datetime.now().year:
+                length = int(rng.integers(1, 12))
+                end = year + length
+                leader += 1
+                rows.append({
+                    'Country': f'Country {region}-{country}',
+                    'President name': f'Leader {leader}',
+                    'Status': 'Former',
+                    'Start Year': year,
+                    'End Year': end if end < datetime.now().year else 'Incumbent',
+                    'Number of terms served': int(rng.integers(1, 4)),
+                    'Term limit': 2,
+                    'Term length': 5,
+                    'Historical Context': 'Complied',
+                })
+                year = end
+            # a few leaders with an unknown end year
+            if country % 7 == 0:
+                rows[-1]['End Year'] = np.nan
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def legacy_term_limits(term_limits_df):
+    # the row-wise implementation this transform replaced, kept to check results and compare timings
+    term_limits_df = term_limits_df.copy()
+    term_limits_df['Sequence'] = term_limits_df.groupby('Country').cumcount() + 1
+    suffixes = {1: 'st', 2: 'nd', 3: 'rd'}
+
+    def get_sequence(n):
+        if 10 <= n % 30 <= 20:
+            suffix = 'th'
+        else:
+            suffix = suffixes.get(n % 10, 'th')
+        return f"{n}{suffix} Leader"
+
+    term_limits_df['Presidential Sequence'] = term_limits_df['Sequence'].apply(get_sequence)
+    term_limits_df.rename(columns={
+        'Number of terms served': 'Terms served',
+        'Term limit': 'Legal maximum number of terms',
+        'Term length': 'Legal maximum duration of each term',
+        'Historical Context': 'Historical compliance'
+    }, inplace=True)
+    current_year = datetime.now().year
+    term_limits_df['End Year Temporary'] = term_limits_df['End Year'].replace('Incumbent', current_year)
+    term_limits_df['End Year Temporary'] = pd.to_numeric(term_limits_df['End Year Temporary'], errors='coerce')
+    term_limits_df['Duration'] = term_limits_df.apply(
+        lambda row: '' if pd.isna(row['End Year Temporary']) else int(row['End Year Temporary']) - row['Start Year'],
+        axis=1
+    )
+    term_limits_df = term_limits_df.drop(columns=['End Year Temporary'])
+    term_limits_df['Country-A'] = term_limits_df['Country']
+    term_limits_df['Sizing'] = term_limits_df.apply(
+        lambda row: '' if row['Duration'] == '' else row['Duration'] ** 2, axis=1
+    )
+    term_limits_df['Start Year'] = term_limits_df['Start Year'].fillna(0).astype(int)
+    term_limits_df['Duration'] = term_limits_df['Duration'].apply(lambda x: int(x) if x != '' else 0)
+    term_limits_df['Sizing'] = term_limits_df['Sizing'].apply(lambda x: int(x) if x != '' else 0)
+    term_limits_df.sort_values(by=['Country', 'Country-A', 'Sequence'], ascending=[True, True, True], inplace=True)
+    return term_limits_df[[
+        'Country', 'Sequence', 'President name', 'Presidential Sequence', 'Status', 'Start Year', 'End Year',
+        'Duration', 'Terms served', 'Legal maximum number of terms', 'Legal maximum duration of each term',
+        'Historical compliance', 'Sizing', 'Country-A'
+    ]]
+
+
+def best_of(fn, df, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == '__main__':
+    print(f"{'rows':>8} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for regions, countries in SIZES:
+        leaders = synthetic_leaders(regions, countries)
+        legacy_time, expected = best_of(legacy_term_limits, leaders)
+        vectorized_time, result = best_of(process_term_limits, leaders)
+        assert expected.to_csv(index=False) == result.to_csv(index=False), 'term limits output changed'
+        print(f'{len(leaders):>8} {legacy_time:>12.4f} {vectorized_time:>15.4f} {legacy_time / vectorized_time:>7.1f}x')
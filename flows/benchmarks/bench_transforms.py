@@ -0,0 +1,216 @@
+# Microbenchmarks for every stateless transform in domain.elections.transforms
+# Each transform runs on synthetic sheets at several sizes and its best and median wall time are reported; timings can
+# be saved as a baseline and later runs compared against it, exiting with 1 when a transform got slower than the
+# threshold allows. The test suite runs every case through tests/test_bench_transforms.py, against the baseline named
+# by ELECTION_BENCH_BASELINE when set; the outputs themselves are checked by tests/test_transforms.py. Run from the
+# flows directory:
+#   python -m benchmarks.bench_transforms --save transforms-baseline.json
+#   ELECTION_BENCH_BASELINE=transforms-baseline.json python -m pytest tests/test_bench_transforms.py
+#   python -m benchmarks.bench_transforms --compare transforms-baseline.json --threshold 0.25
+import argparse
+import json
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_term_limits import synthetic_leaders
+from domain.elections import transforms
+from domain.elections.country_dimension import build_country_dimension
+from domain.elections.date_derivations import derive_country_dates
+from domain.elections.schemas import apply_schemas
+
+SIZES = {'small': 54, 'medium': 540, 'large': 5400}  # countries in the synthetic master workbook
+PARTIES = ['Party A', 'Party B', 'Party C', 'Other Parties']
+YEARS = [2012, 2016, 2020, 2024]
+REFERENCE_DATE = pd.Timestamp('2025-06-01')
+
+
+def master_sheets(countries, rng):
+    # the african-level workbook: one row per country, three elections per country
+    n = len(countries)
+    democracy_started = ['January 1993', 'Dec-02', 'Null', 'March 1991', 'Never had an election', 'May 1999']
+    first_election = ['Jun-60', 'December 1963', 'Never had an election', 'March 1991', 'Null', 'Feb-59']
+    countries_df = pd.DataFrame({
+        'Country': countries,
+        'Stears URL': [f'https://example.com/{i}' if i % 3 else np.nan for i in range(n)],
+        'Longitude': rng.uniform(-20, 50, n).round(3), 'Latitude': rng.uniform(-35, 35, n).round(3),
+        'Date that current continuous democracy started (i.e. elections were held)':
+            [democracy_started[i % 6] for i in range(n)],
+        'Date that the first competitive democratic elections were held': [first_election[i % 6] for i in range(n)],
+        'Democracy age note': [np.nan if i % 2 else 'Interrupted by a coup' for i in range(n)],
+        'State of Civilian Rule': rng.choice(['Stable', 'Coup', 'Conflict'], n),
+        'System of government label': 'Presidential', 'Who runs the government?': 'The president',
+        'How are they elected?': [np.nan if i % 4 == 0 else 'Popular vote' for i in range(n)],
+        'Regional govts have autonomy?': 'No', 'Legislature?': 'Unicameral',
+        'Current Pres Birth Date': [f'{i % 27 + 1:02d}-Mar-{50 + i % 40}' for i in range(n)],
+        'Current Pres Start Date': [f'07-Jan-{17 + i % 8:02d}' for i in range(n)],
+    })
+    elections = pd.DataFrame({
+        'Country': np.repeat(countries, 3),
+        'Date': [f'{i % 27 + 1} {["Jan", "Mar", "Jun", "Sep", "Dec"][i % 5]} {2019 + i % 9}' if i % 11 else np.nan
+                 for i in range(n * 3)],
+        'Type': ['Presidential', 'Legislative', 'General'] * n,
+        'Description': [[np.nan, 'A close race', 'See https://example.com'][i % 3] for i in range(n * 3)],
+        'Date (placeholder)': ['Yes' if i % 4 == 0 else 'No' for i in range(n * 3)],
+        'Priority': ['Yes' if i % 3 == 0 else 'No' for i in range(n * 3)],
+    })
+    sheets = apply_schemas({
+        'elections': elections,
+        'countries': countries_df,
+        'population': pd.DataFrame({'Country': countries, 'Population': rng.integers(10 ** 6, 2 * 10 ** 8, n).astype(float)}),
+        'gdp': pd.DataFrame({'Country': countries, 'GDP': rng.integers(10 ** 9, 5 * 10 ** 11, n).astype(float)}),
+        'democracy_level': pd.DataFrame({'Country': countries,
+                                         'Democracy': rng.choice(['Hybrid regime', 'Authoritarian', 'Flawed democracy'], n)}),
+    }, label='benchmark', strict=True)
+    sheets['country_dates'] = derive_country_dates(sheets['countries'], reference_date=REFERENCE_DATE)
+    sheets['country_dimension'] = build_country_dimension(sheets['countries'], sheets['population'], sheets['gdp'],
+                                                          sheets['democracy_level'])
+    return sheets
+
+
+def country_sheets(regions, rng):
+    # one country workbook with subnational results for the given number of regions per election year
+    n = len(YEARS) * 2
+    totals = pd.DataFrame({'Source': 's', 'Country': 'Ghana', 'Year': YEARS,
+                           'Winning Party': ['Party A', 'Party B', 'Party A', 'Not available']})
+    subnational = pd.DataFrame({'Source': 's', 'Country': 'Ghana', 'Year': np.repeat(YEARS, regions),
+                                'Region': [f'Region {i}' for i in range(regions)] * len(YEARS)})
+    for party in PARTIES:
+        totals[party] = rng.integers(0, 10 ** 6, len(YEARS)).astype(float)
+        subnational[party] = rng.integers(0, 10 ** 5, len(subnational)).astype(float)
+    return apply_schemas({
+        'Candidates': pd.DataFrame({
+            'Source': 's', 'Name': [f'Candidate {i}' for i in range(n)], 'Headshot URL': 'https://example.com/img',
+            'Birth Date': '1960', 'Gender': ['Male', 'Female'] * (n // 2), 'Party': [f'P{i % 3}' for i in range(n)],
+            'Coalition': ['-', 'Alliance'] * (n // 2), 'Year': np.repeat(YEARS, 2),
+            'Previous Positions': ['Minister (2001-2005)Governor (2008-2012)', 'MP (1999)'] * (n // 2),
+            'Display': ['Yes', 'Yes', 'No', 'Yes'] * (n // 4), 'Winner': ['Yes', 'No'] * (n // 2),
+        }),
+        'Pres-Results-Total': totals,
+        'Pres-Election-Results': totals.copy(),
+        'Pres-Results-Subnational': subnational,
+        'Legislative-Control': pd.DataFrame({
+            'Source': 's', 'Country': 'Ghana', 'Year': np.repeat(YEARS, 2), 'Parliament Type': ['Upper', 'Lower'] * 4,
+            'Party A': rng.integers(0, 200, n).astype(float), 'Party B': rng.integers(0, 200, n).astype(float),
+            'Other Parties': rng.integers(0, 20, n), 'Vacant': rng.integers(0, 5, n),
+        }),
+        'Voter-Metrics': pd.DataFrame({'Country': 'Ghana', 'Year': YEARS,
+                                       **{f'Metric {k}': rng.uniform(0, 100, len(YEARS)) for k in range(14)}}),
+        'Election-Representativeness': pd.DataFrame({
+            'Country': 'Ghana', 'Year': YEARS, 'Source': 'https://example.com/report', 'Observer Group': 'CODEO',
+            'PVT: Was the winning party the same?': ['Yes', 'No', 'Yes', 'Yes'],
+            'PVT: For the winning party, what was the percentage point difference in vote share between PVT and official results?': rng.uniform(0, 2, len(YEARS)).round(1),
+            'PVT: Would the discrepancy have changed who won the overall election results?': ['No', 'Yes', 'No', 'No'],
+        }),
+        'Directory': pd.DataFrame({'Name': [f'Group {i}' for i in range(regions)],
+                                   'Website': [f'https://example.com/{i}' for i in range(regions)],
+                                   'Country': 'Ghana', 'Type': 'Domestic', 'Extra': 1}),
+    }, label='benchmark', strict=True)
+
+
+def cases(size):
+    # [(transform name, callable)] over inputs built once per size, every call gets the same inputs
+    rng = np.random.default_rng(0)
+    countries = [f'Country {i}' for i in range(size)]
+    master = master_sheets(countries, rng)
+    elections = transforms.election_statuses(master['elections'], today=REFERENCE_DATE)
+    stats_table = transforms.key_stats_table(master['countries'], master['country_dates'], master['population'],
+                                             master['country_dimension'])
+    sheets = country_sheets(size, rng)
+    rows = transforms.representativeness_rows(sheets['Election-Representativeness'])
+    leaders = synthetic_leaders(max(size // 54, 1), 54)
+    return [
+        ('election_statuses', lambda: transforms.election_statuses(master['elections'], today=REFERENCE_DATE)),
+        ('tracker_tables', lambda: transforms.tracker_tables(elections, master['country_dimension'])),
+        ('upcoming_points', lambda: transforms.upcoming_points(elections, master['countries'],
+                                                               master['country_dimension'])),
+        ('africa_map_tables', lambda: transforms.africa_map_tables(master['countries'], master['country_dates'],
+                                                                   master['democracy_level'], master['gdp'],
+                                                                   master['population'])),
+        ('key_stats_table', lambda: transforms.key_stats_table(master['countries'], master['country_dates'],
+                                                               master['population'], master['country_dimension'])),
+        ('key_stats_tables', lambda: transforms.key_stats_tables(stats_table)),
+        ('candidate_tables', lambda: transforms.candidate_tables(sheets['Candidates'])),
+        ('results_map_tables', lambda: transforms.results_map_tables(sheets['Pres-Results-Subnational'])),
+        ('bar_chart_tables', lambda: transforms.bar_chart_tables(sheets['Pres-Results-Total'])),
+        ('election_results_bar_chart_tables',
+         lambda: transforms.election_results_bar_chart_tables(sheets['Pres-Election-Results'])),
+        ('parliament_chart_tables', lambda: transforms.parliament_chart_tables(sheets['Legislative-Control'])),
+        ('voter_metrics_table', lambda: transforms.voter_metrics_table(sheets['Voter-Metrics'])),
+        ('voter_metrics_rows', lambda: transforms.voter_metrics_rows(sheets['Voter-Metrics'], 'country')),
+        ('results_rows', lambda: transforms.results_rows(sheets['Pres-Results-Total'])),
+        ('election_resources_table', lambda: transforms.election_resources_table(sheets['Directory'])),
+        ('representativeness_year_tables',
+         lambda: transforms.representativeness_year_tables(sheets['Election-Representativeness'])),
+        ('representativeness_rollup', lambda: transforms.representativeness_rollup([rows] * size)),
+        ('term_limits_table', lambda: transforms.term_limits_table(leaders, reference_year=REFERENCE_DATE.year)),
+    ]
+
+
+def measure(fn, rounds, min_time=0.05):
+    # calls per round are chosen so one round takes at least min_time, per-call times are returned
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    calls = max(1, int(min_time / once)) if once > 0 else 1000
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        timings.append((time.perf_counter() - start) / calls)
+    return min(timings), statistics.median(timings)
+
+
+def run(sizes, rounds, name_filter=None):
+    # {'<transform>[<size>]': {'min': s, 'median': s}}
+    results = {}
+    for size_name in sizes:
+        for name, fn in cases(SIZES[size_name]):
+            if name_filter and name_filter not in name:
+                continue
+            best, median = measure(fn, rounds)
+            results[f'{name}[{size_name}]'] = {'min': best, 'median': median}
+            print(f'{name:>34} {size_name:>7} {best * 1000:>10.3f} ms {median * 1000:>10.3f} ms')
+    return results
+
+
+def regressions(results, baseline, threshold):
+    # benchmarks whose best time grew by more than threshold over the baseline's
+    slower = []
+    for key, timing in results.items():
+        if key in baseline and timing['min'] > baseline[key]['min'] * (1 + threshold):
+            slower.append((key, baseline[key]['min'], timing['min']))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the election artifact transforms')
+    parser.add_argument('--sizes', default=','.join(SIZES), help=f'comma separated, some of {list(SIZES)}')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--filter', default=None, help='only run transforms whose name contains this')
+    parser.add_argument('--save', default=None, help='write the timings to this JSON baseline')
+    parser.add_argument('--compare', default=None, help='compare against this JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown before failing, 0.2 = 20%%')
+    args = parser.parse_args()
+
+    print(f"{'transform':>34} {'size':>7} {'best':>13} {'median':>13}")
+    results = run(args.sizes.split(','), args.rounds, args.filter)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Baseline written to {args.save}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slower = regressions(results, baseline, args.threshold)
+        for key, before, after in slower:
+            print(f'REGRESSION {key}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({after / before:.2f}x)')
+        if slower:
+            sys.exit(1)
+        print(f'No transform slower than {args.threshold:.0%} over {args.compare}')
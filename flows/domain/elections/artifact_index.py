@@ -0,0 +1,90 @@
+# Index of every artifact published by a run
+# Published as index.json so consumers can poll one small object and only fetch the artifacts whose hash changed
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+
+INDEX_KEY = 'index.json'
+
+
+def year_label(year):
+    # the year as an int, the raw label for a non-numeric one (e.g. '2023 (rerun)') and None for a missing one
+    if year is None:
+        return None
+    try:
+        return int(year)
+    except (TypeError, ValueError):
+        return year if isinstance(year, str) else None
+
+
+class ArtifactIndex:
+    def __init__(self):
+        self.entries = {}  # key -> entry, so re-uploads of the same key are only listed once
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def record(self, key, url, family, body, country=None, year=None, content_encoding=None, encoded_size=None,
+               output_format='csv', parts_sha256=None):
+        entry = {
+            'key': key,
+            'url': url,
+            'family': family,
+            'format': output_format,
+            'country': country,
+            'year': year_label(year),
+            'sha256': hashlib.sha256(body).hexdigest(),
+            'size': len(body),
+            'encoded_size': encoded_size if encoded_size is not None else len(body),
+            'content_encoding': content_encoding,
+        }
+        if parts_sha256 is not None:
+            entry['parts_sha256'] = parts_sha256  # bundles: digest of the parts they were built from
+        with self.lock:
+            self.entries[key] = entry
+        return entry
+
+    def urls(self):
+        with self.lock:
+            return [entry['url'] for _, entry in sorted(self.entries.items())]
+
+    def build(self, run_id, previous=None):
+        # merge this run's artifacts into the previous index, an artifact keeps its last-changed run
+        # until its content hash changes, and artifacts not published by this run (e.g. targeted runs) are kept
+        now = datetime.now(timezone.utc).isoformat()
+        previous_entries = {entry['key']: entry for entry in (previous or {}).get('artifacts', [])}
+        merged = dict(previous_entries)
+
+        with self.lock:
+            current_entries = dict(self.entries)
+        for key, entry in current_entries.items():
+            entry = dict(entry)
+            previous_entry = previous_entries.get(key)
+            if previous_entry and previous_entry.get('sha256') == entry['sha256']:
+                entry['last_changed_run'] = previous_entry.get('last_changed_run')
+                entry['last_changed_at'] = previous_entry.get('last_changed_at')
+            else:
+                entry['last_changed_run'] = run_id
+                entry['last_changed_at'] = now
+            merged[key] = entry
+
+        return {
+            'generated_at': now,
+            'run_id': run_id,
+            'artifact_count': len(merged),
+            'artifacts': [merged[key] for key in sorted(merged)],
+        }
+
+    def changed_keys(self, index, run_id):
+        return [entry['key'] for entry in index['artifacts'] if entry.get('last_changed_run') == run_id]
+
+
+def index_to_json(index):
+    return json.dumps(index, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+# Artifacts published by the current run
+artifact_index = ArtifactIndex()
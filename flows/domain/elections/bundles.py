@@ -0,0 +1,118 @@
+# Per-country bundles
+# Every per-country artifact a run publishes (candidates, bar charts, results maps, parliament charts, voter metrics,
+# representativeness, key stats) is also collected into <country>-bundle.json, so a country page can load one
+# gzipped object instead of dozens of CSVs. The bundle is keyed by family, then year ('all' for artifacts without
+# one), then the artifact's own file name:
+#   {"country": "ghana", "parts": {"candidates": {"2020": {"ghana-candidates-2020.csv": {"columns": [...],
+#    "data": [...]}}}}, "hashes": {"ghana-candidates-2020.csv": "<sha256 of the CSV>"}}
+# Results maps are only referenced, {"ghana-map-2020.csv": {"url": "https://..."}}: a country's subnational results
+# are streamed one year at a time (see subnational.py) and holding every year's table until the bundles are built
+# would undo that
+import hashlib
+import json
+import os
+import threading
+
+from domain.elections.serializers import to_json_table
+
+BUNDLES_ENABLED = os.environ.get('ELECTION_COUNTRY_BUNDLES', '1') == '1'
+BUNDLE_FAMILY = 'bundles'
+REFERENCED_FAMILIES = ['results-maps']  # parts kept as the published artifact's URL instead of its table
+
+
+def bundle_key(country):
+    return f'{country}-bundle.json'
+
+
+def normalize_country(country):
+    # key stats name countries 'south-africa', country workbooks 'ghana'
+    return str(country).strip().lower().replace(' ', '-')
+
+
+def parts_digest(hashes):
+    # one hash over every part's CSV hash, unchanged parts give an unchanged digest
+    digest = hashlib.sha256()
+    for key in sorted(hashes):
+        digest.update(f'{key}:{hashes[key]}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def year_label(year):
+    try:
+        return str(int(float(year)))
+    except (TypeError, ValueError):
+        return 'all'
+
+
+class CountryBundles:
+    # collects the parts of every country's bundle while the generators publish
+    def __init__(self):
+        self.parts = {}  # country -> {key: (family, year label, table)}
+        self.hashes = {}  # country -> {key: sha256 of the CSV body}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.parts.clear()
+            self.hashes.clear()
+
+    def add(self, country, family, year, key, df, csv_body, url=None):
+        country = normalize_country(country)
+        table = {'url': url} if family in REFERENCED_FAMILIES else to_json_table(df)
+        sha256 = hashlib.sha256(csv_body).hexdigest()
+        with self.lock:
+            self.parts.setdefault(country, {})[key] = (family, year_label(year), table)
+            self.hashes.setdefault(country, {})[key] = sha256
+
+    def countries(self):
+        with self.lock:
+            return sorted(self.parts)
+
+    def changed_parts(self, country, previous_sha256):
+        # keys of this run's parts whose CSV differs from the previous run's, previous_sha256(key) looks it up
+        with self.lock:
+            hashes = dict(self.hashes.get(country, {}))
+        return [key for key, sha256 in hashes.items() if previous_sha256(key) != sha256]
+
+    def families(self, country):
+        with self.lock:
+            return {family for family, _, _ in self.parts.get(country, {}).values()}
+
+    def build(self, country, previous=None, keep_families=None):
+        # the bundle for one country; parts of a previous bundle are kept unless republished, all of them for a
+        # partial run, only those of keep_families (families a full run didn't regenerate) otherwise
+        bundle_parts = {}
+        with self.lock:
+            parts = dict(self.parts.get(country, {}))
+            hashes = dict(self.hashes.get(country, {}))
+        if previous:
+            previous_hashes = previous.get('hashes', {})
+            for family, years in previous.get('parts', {}).items():
+                if keep_families is not None and family not in keep_families:
+                    continue
+                for year, tables in years.items():
+                    for key, table in tables.items():
+                        # a republished artifact may have moved family or year, only its new place is kept
+                        if key in parts:
+                            continue
+                        bundle_parts.setdefault(family, {}).setdefault(year, {})[key] = table
+                        if key in previous_hashes:
+                            hashes[key] = previous_hashes[key]
+        for key, (family, year, table) in parts.items():
+            bundle_parts.setdefault(family, {}).setdefault(year, {})[key] = table
+        bundle_parts = {family: {year: tables for year, tables in years.items() if tables}
+                        for family, years in bundle_parts.items()}
+        return {
+            'country': country,
+            'parts': {family: years for family, years in sorted(bundle_parts.items()) if years},
+            'hashes': {key: hashes[key] for key in sorted(hashes)},
+        }
+
+
+def bundle_to_json(bundle):
+    return json.dumps(bundle, separators=(',', ':'), ensure_ascii=False, allow_nan=False, sort_keys=True,
+                      default=str).encode('utf-8')
+
+
+# Parts collected by the current run
+country_bundles = CountryBundles()
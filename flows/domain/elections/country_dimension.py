@@ -0,0 +1,51 @@
+# Country dimension table
+# Country-level attributes from the master sheets are collected once per run into a table indexed by a categorical
+# country key, so generators look up the columns they need by index instead of re-merging the source sheets
+import pandas as pd
+
+DIMENSION_SOURCES = [
+    # (sheet frame name, columns taken from it)
+    ('countries', ['Stears URL', 'Longitude', 'Latitude', 'State of Civilian Rule']),
+    ('population', ['Population']),
+    ('gdp', ['GDP']),
+    ('democracy_level', ['Democracy']),
+]
+
+
+def country_index(df, columns=None, country_col='Country'):
+    # one row per country (first occurrence wins), indexed by country
+    df = df[df[country_col].notna()].drop_duplicates(subset=country_col, keep='first')
+    df = df.set_index(df[country_col].astype(object).rename('Country'))
+    return df[columns] if columns is not None else df.drop(columns=[country_col])
+
+
+def build_country_dimension(countries_df, population_df, gdp_df, democracy_level_df):
+    sheets = {'countries': countries_df, 'population': population_df, 'gdp': gdp_df,
+              'democracy_level': democracy_level_df}
+    tables = [country_index(sheets[name], columns) for name, columns in DIMENSION_SOURCES]
+
+    # countries in the order of the countries sheet, then any only listed in the other sheets
+    countries = pd.Index(tables[0].index)
+    for table in tables[1:]:
+        countries = countries.append(table.index.difference(countries, sort=False))
+    key = pd.CategoricalIndex(countries, categories=countries, name='Country')
+
+    dimension = pd.concat([table.reindex(countries) for table in tables], axis=1)
+    dimension.index = key
+    return dimension
+
+
+def lookup(table, countries, columns):
+    # index-aligned lookup of a country-indexed table for a Series of countries, missing countries get NaN
+    values = table[columns].reindex(pd.Index(countries.astype(object)))
+    values.index = countries.index
+    return values
+
+
+def profile_order(countries, profile_countries):
+    # positions that put rows in the order of the countries sheet (stable within a country), dropping rows for
+    # countries that don't have a profile
+    codes = pd.Index(profile_countries.astype(object)).drop_duplicates().get_indexer(countries.astype(object))
+    positions = pd.Series(codes)
+    positions = positions[positions >= 0]
+    return positions.sort_values(kind='stable').index.to_numpy()
@@ -0,0 +1,107 @@
+# Vectorized date derivations for the countries sheet
+# Each date column is parsed once, sentinel values ('Non-democracy', 'Null', 'Never had an election') are handled
+# with masks instead of per-row branches, and every age is measured against a single reference date
+import numpy as np
+import pandas as pd
+
+CURRENT_DEMOCRACY_DATE = 'Date that current continuous democracy started (i.e. elections were held)'
+FIRST_ELECTION_DATE = 'Date that the first competitive democratic elections were held'
+PRES_BIRTH_DATE = 'Current Pres Birth Date'
+PRES_START_DATE = 'Current Pres Start Date'
+
+NON_DEMOCRACY = 'Non-democracy'
+DEMOCRACY_SENTINELS = ['Non-democracy', 'Null', 'Never had an election']
+
+# formats used in the sheet, tried in order before falling back to pandas' own parsing
+DEMOCRACY_DATE_FORMATS = ('%B %Y', '%b-%y')
+PRES_DATE_FORMATS = ('%d-%b-%y',)
+
+DEMOCRACY_AGE_BINS = [-np.inf, 10, 20, 40, 60, 80]
+DEMOCRACY_AGE_LABELS = ['<10 yrs', '10-19 yrs', '20-39 yrs', '40-59 yrs', '60-79 yrs']
+
+
+def reference_timestamp(reference_date=None):
+    return pd.Timestamp(reference_date if reference_date is not None else pd.Timestamp.today()).normalize()
+
+
+def sentinel_mask(values, sentinels=DEMOCRACY_SENTINELS):
+    return values.isna() | values.isin(sentinels)
+
+
+def parse_dates(values, formats, sentinels=DEMOCRACY_SENTINELS):
+    # dates that Excel already typed pass straight through, strings are parsed with each format in turn
+    candidates = values.where(~sentinel_mask(values, sentinels))
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    remaining = candidates.notna()
+    for date_format in formats:
+        if not remaining.any():
+            break
+        parsed[remaining] = pd.to_datetime(candidates[remaining], format=date_format, errors='coerce')
+        remaining = remaining & parsed.isna()
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(candidates[remaining], errors='coerce')
+    return parsed
+
+
+def years_since(dates, reference_date=None):
+    # calendar years between the date and the reference date, NaN where there is no date
+    return reference_timestamp(reference_date).year - dates.dt.year
+
+
+def full_years_since(dates, reference_date=None):
+    # completed years, i.e. an age that only goes up on the anniversary
+    reference = reference_timestamp(reference_date)
+    before_anniversary = (dates.dt.month > reference.month) | (
+        (dates.dt.month == reference.month) & (dates.dt.day > reference.day))
+    years = reference.year - dates.dt.year - before_anniversary.astype(int)
+    return years.astype('int64') if years.notna().all() else years
+
+
+def as_object_ints(years):
+    # whole numbers as Python ints in an object column, so they can sit next to labels like 'Non-democracy'
+    result = years.astype('Int64').astype(object)
+    return result.where(years.notna(), np.nan)
+
+
+def democracy_age_bucket(raw, dates, reference_date=None):
+    # '<10 yrs' ... '60-79 yrs', non-democracies keep their label and anything else is left empty
+    buckets = pd.cut(years_since(dates, reference_date), bins=DEMOCRACY_AGE_BINS, labels=DEMOCRACY_AGE_LABELS,
+                     right=False).astype(object)
+    buckets = buckets.where(buckets.notna(), None)
+    return buckets.mask(raw == NON_DEMOCRACY, NON_DEMOCRACY)
+
+
+def democracy_age_years(raw, dates, reference_date=None, sentinel_value=''):
+    # years since the date, with '' for empty cells and every sentinel
+    years = as_object_ints(years_since(dates, reference_date))
+    return years.mask(sentinel_mask(raw), sentinel_value)
+
+
+def key_stat_democracy_age(raw, dates, reference_date=None):
+    # years since the date, non-democracies keep their label
+    return as_object_ints(years_since(dates, reference_date)).mask(raw == NON_DEMOCRACY, NON_DEMOCRACY)
+
+
+def derive_country_dates(countries_df, reference_date=None):
+    # every date-derived column used by generate_africa_maps and generate_key_stats, computed in one pass
+    reference = reference_timestamp(reference_date)
+    current_democracy = countries_df[CURRENT_DEMOCRACY_DATE]
+    first_election = countries_df[FIRST_ELECTION_DATE]
+    current_democracy_dates = parse_dates(current_democracy, DEMOCRACY_DATE_FORMATS)
+    first_election_dates = parse_dates(first_election, DEMOCRACY_DATE_FORMATS)
+    birth_dates = parse_dates(countries_df[PRES_BIRTH_DATE], PRES_DATE_FORMATS, sentinels=[])
+    start_dates = parse_dates(countries_df[PRES_START_DATE], PRES_DATE_FORMATS, sentinels=[])
+
+    return pd.DataFrame({
+        'Country': countries_df['Country'],
+        'African Map Democracy Age': democracy_age_bucket(current_democracy, current_democracy_dates, reference),
+        'Years since first competitive election*': democracy_age_years(first_election, first_election_dates,
+                                                                       reference),
+        'Age of current continuous democracy***': democracy_age_years(current_democracy, current_democracy_dates,
+                                                                      reference),
+        'Key Stat Democracy Age': key_stat_democracy_age(current_democracy, current_democracy_dates, reference),
+        PRES_BIRTH_DATE: birth_dates,
+        PRES_START_DATE: start_dates,
+        'President_age': full_years_since(birth_dates, reference),
+        'President_tenure': full_years_since(start_dates, reference),
+    }, index=countries_df.index)
@@ -0,0 +1,87 @@
+# Download buffers for Drive workbooks
+# A download is kept in memory while it is small and spills to a temporary file once it passes the spool threshold,
+# so a large subnational results workbook never sits in RAM twice (response chunk plus a growing BytesIO). Spilled
+# workbooks are handed to the Excel reader by path. The MD5 of the content is computed as the chunks arrive
+import hashlib
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+MIB = 1024 * 1024
+
+# bytes per ranged GET, each response chunk is held in memory while it is written out; fewer, larger chunks mean
+# fewer round trips for big workbooks (the API client's default is 100 MiB)
+DOWNLOAD_CHUNK_SIZE = int(float(os.environ.get('ELECTION_DOWNLOAD_CHUNK_MB', '100')) * MIB)
+# downloads up to this size stay in memory
+SPOOL_THRESHOLD = int(float(os.environ.get('ELECTION_DOWNLOAD_SPOOL_MB', '32')) * MIB)
+SPOOL_DIR = os.environ.get('ELECTION_DOWNLOAD_SPOOL_DIR') or None  # None is the system temp directory
+
+
+def chunk_size_for(file_size=None, chunk_size=None):
+    # one request for files smaller than the configured chunk, rounded up to a whole MiB
+    chunk_size = chunk_size or DOWNLOAD_CHUNK_SIZE
+    try:
+        file_size = int(file_size)
+    except (TypeError, ValueError):
+        return chunk_size
+    return max(MIB, min(chunk_size, -(-file_size // MIB) * MIB))
+
+
+class SpooledDownload:
+    # a writable buffer for MediaIoBaseDownload; in memory until threshold bytes, then a named temporary file
+    def __init__(self, threshold=None, spool_dir=None, label=None):
+        self.threshold = SPOOL_THRESHOLD if threshold is None else threshold
+        self.spool_dir = spool_dir or SPOOL_DIR
+        self.label = label
+        self.buffer = BytesIO()
+        self.path = None
+        self.size = 0
+        self.digest = hashlib.md5()
+
+    @property
+    def spilled(self):
+        return self.path is not None
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        if not self.spilled and self.size > self.threshold:
+            self.spill()
+        return self.buffer.write(data)
+
+    def spill(self):
+        # move what has been downloaded so far to a temporary file and keep writing there
+        prefix = f"{self.label or 'workbook'}-".replace(os.sep, '-')
+        temp = tempfile.NamedTemporaryFile(prefix=prefix, suffix='.xlsx', dir=self.spool_dir, delete=False)
+        self.buffer.seek(0)
+        shutil.copyfileobj(self.buffer, temp)
+        self.buffer.close()
+        self.buffer = temp
+        self.path = temp.name
+
+    def md5(self):
+        return self.digest.hexdigest()
+
+    def source(self):
+        # what pd.read_excel should read: the temporary file's path, or the in-memory buffer rewound
+        if self.spilled:
+            self.buffer.flush()
+            return self.path
+        self.buffer.seek(0)
+        return self.buffer
+
+    def close(self):
+        self.buffer.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                print(f'Failed to remove spooled download {self.path}: {e}')
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,57 @@
+# Long-format engine for the per-country key stats tables
+# The wide stats table (one row per country) is stacked once into (Country, Attribute, Value) rows and every
+# country's CSV body is cut from a single serialization of that long frame
+import numpy as np
+import pandas as pd
+
+EMPTY_ROW = ',\n'  # each table starts with an empty Attribute/Value row
+
+
+def unique_countries(stats_table, country_col):
+    # a country listed twice keeps its first position and its last row, like filling a dict would
+    stats_table = stats_table[stats_table[country_col].notna()]
+    order = stats_table[country_col].drop_duplicates(keep='first')
+    return stats_table.drop_duplicates(subset=country_col, keep='last').set_index(country_col).loc[order]
+
+
+def key_stats_long(stats_table, country_col, drop_cols=()):
+    wide = unique_countries(stats_table, country_col)
+    attributes = [col for col in wide.columns if col not in drop_cols]
+    values = wide[attributes].to_numpy(dtype=object)
+    return pd.DataFrame({
+        'Country': np.repeat(wide.index.to_numpy(dtype=object), len(attributes)),
+        'Attribute': np.tile(np.array(attributes, dtype=object), len(wide)),
+        'Value': values.ravel(),
+    })
+
+
+def key_stats_csv_bodies(stats_table, country_col, drop_cols=()):
+    # returns {country: csv body}, byte for byte what to_csv(header=False) gives for each transposed table
+    long_df = key_stats_long(stats_table, country_col, drop_cols)
+    countries = long_df['Country'].drop_duplicates().tolist()
+    if not countries:
+        return {}
+    attribute_count = len(long_df) // len(countries)
+    table = long_df[['Attribute', 'Value']]
+
+    # one to_csv call for every country, split back into blocks of lines; a quoted line break would make
+    # lines and rows disagree, so in that case each country's slice is written separately
+    has_line_breaks = table.apply(lambda col: col.astype(str).str.contains('[\r\n]', regex=True).any()).any()
+    if not has_line_breaks:
+        lines = table.to_csv(index=False, header=False, lineterminator='\n').split('\n')
+        return {
+            country: EMPTY_ROW + '\n'.join(lines[i * attribute_count:(i + 1) * attribute_count]) + '\n'
+            for i, country in enumerate(countries)
+        }
+    return {
+        country: EMPTY_ROW + table.iloc[i * attribute_count:(i + 1) * attribute_count].to_csv(
+            index=False, header=False, lineterminator='\n')
+        for i, country in enumerate(countries)
+    }
+
+
+def key_stats_frames(stats_table, country_col, drop_cols=()):
+    # returns {country: Attribute/Value frame}, the tables behind key_stats_csv_bodies for the other output formats
+    long_df = key_stats_long(stats_table, country_col, drop_cols)
+    return {country: table[['Attribute', 'Value']].reset_index(drop=True)
+            for country, table in long_df.groupby('Country', sort=False)}
@@ -0,0 +1,80 @@
+# Parliament seat chart builder
+# The Legislative-Control sheet is reshaped once into a long (Year, Chamber, Coalition, Seats) table sorted with a
+# grouped key, so every year/chamber chart is a contiguous slice instead of its own transpose. Two sheet mistakes
+# that used to stop the whole generator are charted instead and printed: a year and chamber repeated on several
+# rows is charted from its first row, and a seat count that isn't a number (e.g. 'TBD') is charted as 0
+import numpy as np
+import pandas as pd
+
+PARLIAMENT_TYPES = ['Bicameral', 'Unicameral', 'Upper', 'Lower']
+# coalitions always shown at the bottom of a chart, in this order
+SPECIAL_COALITIONS = ['Other Parties', 'Appointed', 'Vacant', 'N/A - These seats did not exist at the time']
+# every other column of the sheet is a coalition
+SHEET_COLUMNS = ['Source', 'Country', 'Year', 'Parliament Type']
+
+
+def coalition_columns(legislative_df):
+    return np.array([c for c in legislative_df.columns if c not in SHEET_COLUMNS], dtype=object)
+
+
+def parliament_seats_long(legislative_df, label=None):
+    # keep the first row for each year and chamber, rows without a year have no chart
+    where = "'Legislative-Control' sheet" + (f" of {label}" if label else '')
+    df = legislative_df[legislative_df['Parliament Type'].isin(PARLIAMENT_TYPES) & legislative_df['Year'].notna()]
+    repeated = df.duplicated(['Year', 'Parliament Type'])
+    if repeated.any():
+        dropped = [f'{year} {chamber}' for year, chamber in zip(df.loc[repeated, 'Year'],
+                                                                 df.loc[repeated, 'Parliament Type'])]
+        print(f'{where}: charting only the first row of each year and chamber, ignored repeated rows for {dropped}')
+        df = df[~repeated]
+    coalitions = coalition_columns(df)
+    values = df[coalitions]
+    numbers = values.apply(pd.to_numeric, errors='coerce')
+    text = numbers.isna() & values.notna()
+    if text.to_numpy().any():
+        rows, cols = np.nonzero(text.to_numpy())
+        cells = [f"{coalitions[col]} in {df['Year'].iloc[row]} {df['Parliament Type'].iloc[row]} "
+                 f"({values.iat[row, col]!r})" for row, col in zip(rows, cols)]
+        print(f'{where}: charting seat counts that are not numbers as 0: {cells}')
+    seats = numbers.to_numpy(dtype='float64', na_value=np.nan)
+    seats = np.nan_to_num(seats, nan=0).astype('int64')
+
+    rows, columns = seats.shape
+    year_codes = pd.factorize(df['Year'])[0]  # years in order of first appearance
+    chamber_codes = df['Parliament Type'].astype(object).map({p_type: i for i, p_type in enumerate(PARLIAMENT_TYPES)}).to_numpy()
+    special_rank = np.array([SPECIAL_COALITIONS.index(c) + 1 if c in SPECIAL_COALITIONS else 0 for c in coalitions])
+
+    long_df = pd.DataFrame({
+        'Year': np.repeat(df['Year'].to_numpy(), columns),
+        'Chamber': np.repeat(df['Parliament Type'].to_numpy(dtype=object), columns),
+        'Coalition': np.tile(coalitions, rows),
+        'Seats': seats.ravel(),
+    })
+
+    # one sort for every chart: year, chamber, then regular coalitions by seats (ties in sheet order)
+    # followed by the special coalitions in their fixed order
+    order = np.lexsort((
+        np.tile(np.arange(columns), rows),
+        -long_df['Seats'].to_numpy(),
+        np.tile(special_rank, rows),
+        np.repeat(chamber_codes, columns),
+        np.repeat(year_codes, columns),
+    ))
+    return long_df.iloc[order].reset_index(drop=True)
+
+
+def parliament_charts(legislative_df, label=None):
+    # returns [(year, chamber, frame)] where each frame is a Coalition column plus the seats for that year
+    long_df = parliament_seats_long(legislative_df, label=label)
+    if long_df.empty:
+        return []
+    coalition_count = len(coalition_columns(legislative_df))
+    charts = []
+    for start in range(0, len(long_df), coalition_count):
+        block = long_df.iloc[start:start + coalition_count]
+        year = block['Year'].iloc[0]
+        # a numeric year heads the chart as an int, a label such as '2023 (rerun)' is kept as it is
+        header = int(year) if pd.api.types.is_number(year) and float(year).is_integer() else year
+        chart = pd.DataFrame({'Coalition': block['Coalition'].to_numpy(), header: block['Seats'].to_numpy()})
+        charts.append((year, block['Chamber'].iloc[0], chart))
+    return charts
@@ -0,0 +1,166 @@
+# Opt-in profiling of the generator tasks
+# With ELECTION_PROFILE=1 (or the flow's profile parameter) every wrapped task runs under cProfile, tracemalloc and
+# a stack sampler, and writes <task>.pstats, <task>.collapsed (flamegraph.pl / speedscope input) and
+# <task>.allocations.txt to the profile directory; a markdown summary is handed to the configured publisher
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get('ELECTION_PROFILE_DIR', os.path.expanduser('~/.cache/election-profiles'))
+SAMPLE_INTERVAL = float(os.environ.get('ELECTION_PROFILE_INTERVAL_MS', '5')) / 1000
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 25
+
+PROFILE_BY_DEFAULT = os.environ.get('ELECTION_PROFILE', '0') == '1'
+
+settings = {
+    'enabled': PROFILE_BY_DEFAULT,
+    'output_dir': None,
+    'publish': None,  # called with (task name, markdown summary)
+}
+
+
+def configure(enabled=None, run_id=None, publish=None):
+    # called at the start of each run, a serve() process keeps these settings between runs
+    settings['enabled'] = PROFILE_BY_DEFAULT if enabled is None else enabled
+    run_id = run_id or datetime.now().strftime('%Y%m%dT%H%M%S')
+    settings['output_dir'] = os.path.join(PROFILE_DIR, str(run_id))
+    settings['publish'] = publish
+
+
+def is_enabled():
+    return settings['enabled']
+
+
+class StackSampler:
+    # samples one thread's Python stack at a fixed interval and counts identical stacks, which gives the collapsed
+    # format flamegraph tools read: 'outer;inner;leaf <samples>'
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+
+def allocation_report(snapshot, peak, limit=TOP_ALLOCATIONS):
+    lines = [f'peak traced memory: {peak / 1024 / 1024:.1f} MiB', f'top {limit} allocation sites still held:']
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f'{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}')
+    return '\n'.join(lines) + '\n'
+
+
+def markdown_summary(name, elapsed, peak, snapshot, profiler, paths):
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    rows = []
+    for func in stats.fcn_list[:10]:
+        _, calls, total, cumulative, _ = stats.stats[func]
+        filename, line, function = func
+        rows.append(f'| `{function}` ({os.path.basename(filename)}:{line}) | {calls} | {total:.3f} | {cumulative:.3f} |')
+    allocations = [
+        f'| {stat.traceback[0].filename}:{stat.traceback[0].lineno} | {stat.size / 1024:.1f} |'
+        for stat in snapshot.statistics('lineno')[:10]
+    ]
+    return '\n'.join([
+        f'# Profile: {name}',
+        f'{elapsed:.2f}s wall time, {peak / 1024 / 1024:.1f} MiB peak traced memory',
+        '',
+        '| function | calls | own (s) | cumulative (s) |',
+        '| --- | --- | --- | --- |',
+        *rows,
+        '',
+        '| allocation site | KiB |',
+        '| --- | --- |',
+        *allocations,
+        '',
+        'Files: ' + ', '.join(f'`{path}`' for path in paths),
+    ])
+
+
+def profile_call(name, fn, *args, **kwargs):
+    # run fn under the profilers and write its reports, the result of fn is returned unchanged
+    if settings['output_dir'] is None:
+        configure()
+    os.makedirs(settings['output_dir'], exist_ok=True)
+    base = os.path.join(settings['output_dir'], name)
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    sampler = StackSampler(threading.get_ident())
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+
+        paths = [f'{base}.pstats', f'{base}.collapsed', f'{base}.allocations.txt']
+        profiler.dump_stats(paths[0])
+        with open(paths[1], 'w') as f:
+            f.write(sampler.collapsed())
+        with open(paths[2], 'w') as f:
+            f.write(allocation_report(snapshot, peak))
+        print(f'Profiled {name} in {elapsed:.2f}s, reports written to {base}.*')
+        print(top_functions(profiler, limit=10))
+
+        if settings['publish'] is not None:
+            try:
+                settings['publish'](name, markdown_summary(name, elapsed, peak, snapshot, profiler, paths))
+            except Exception as e:
+                print(f'Failed to publish the profile of {name}: {e}')
+
+
+def profiled(fn):
+    # wraps a task body, profiling only runs while it is enabled so the decorator costs nothing otherwise
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not settings['enabled']:
+            return fn(*args, **kwargs)
+        return profile_call(fn.__name__, fn, *args, **kwargs)
+    return wrapper
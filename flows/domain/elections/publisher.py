@@ -0,0 +1,112 @@
+# Content encoding and caching policy for published artifacts
+# Artifacts are grouped into families (trackers, candidates, parliament charts...) and each family gets a
+# Cache-Control policy, e.g. live trackers are cached for minutes while past election years are cached for a week
+import gzip
+import os
+from datetime import datetime
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, 'br' falls back to gzip
+    brotli = None
+
+ARTIFACT_FAMILIES = [
+    'trackers', 'points', 'maps', 'key-stats', 'candidates', 'bar-charts', 'results-maps', 'parliament',
+    'voter-metrics', 'resources', 'representativeness', 'term-limits',
+]
+
+CACHE_CONTROL_POLICIES = {
+    'live': 'public, max-age=300, stale-while-revalidate=60',
+    'daily': 'public, max-age=3600, stale-while-revalidate=86400',
+    'historical': 'public, max-age=604800, stale-while-revalidate=86400',
+}
+
+# families that change on election nights stay short-lived, everything else is refreshed nightly
+FAMILY_CACHE_POLICIES = {
+    'trackers': 'live',
+    'points': 'live',
+    'bar-charts': 'live',
+    'results-maps': 'live',
+    'index': 'live',
+    'bundles': 'live',
+}
+
+# every artifact is published as CSV, json (compact, column-oriented) and parquet can be added alongside it,
+# e.g. ELECTION_OUTPUT_FORMATS=json or ELECTION_OUTPUT_FORMATS_RESULTS_MAPS=json,parquet for one family
+OUTPUT_FORMATS = os.environ.get('ELECTION_OUTPUT_FORMATS', 'csv')
+FORMAT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'parquet': 'application/vnd.apache.parquet',
+}
+PRECOMPRESSED_FORMATS = ['parquet']  # compressed by the format itself, stored without a Content-Encoding
+
+# identity, gzip or br (brotli); ELECTION_CONTENT_ENCODING_<FAMILY> overrides it for one family
+CONTENT_ENCODING = os.environ.get('ELECTION_CONTENT_ENCODING', 'gzip')
+MIN_COMPRESS_BYTES = 256  # smaller bodies grow when compressed
+
+
+def content_encoding_for(family):
+    env_family = family.upper().replace('-', '_')
+    return os.environ.get(f'ELECTION_CONTENT_ENCODING_{env_family}', CONTENT_ENCODING)
+
+
+def output_formats_for(family):
+    env_family = family.upper().replace('-', '_')
+    requested = os.environ.get(f'ELECTION_OUTPUT_FORMATS_{env_family}', OUTPUT_FORMATS)
+    formats = ['csv']
+    for output_format in requested.split(','):
+        output_format = output_format.strip().lower()
+        if output_format in FORMAT_CONTENT_TYPES and output_format not in formats:
+            formats.append(output_format)
+        elif output_format and output_format not in FORMAT_CONTENT_TYPES:
+            print(f"Unknown output format '{output_format}' for {family}, expected one of {list(FORMAT_CONTENT_TYPES)}")
+    return formats
+
+
+def format_key(key, output_format):
+    # africa-map-gdp.csv -> africa-map-gdp.json
+    return f'{os.path.splitext(key)[0]}.{output_format}'
+
+
+def cache_control_for(family, year=None):
+    # partitions for past election years no longer change, so they can be cached for much longer
+    if year is not None:
+        try:
+            if int(year) < datetime.now().year:
+                return CACHE_CONTROL_POLICIES['historical']
+        except (TypeError, ValueError):
+            pass
+    return CACHE_CONTROL_POLICIES[FAMILY_CACHE_POLICIES.get(family, 'daily')]
+
+
+def encode_body(body, encoding):
+    # returns (body, Content-Encoding header or None)
+    if encoding == 'identity' or len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(body, quality=11), 'br'
+    # mtime=0 keeps the output deterministic, so unchanged artifacts produce identical objects
+    return gzip.compress(body, compresslevel=9, mtime=0), 'gzip'
+
+
+def decode_body(body, content_encoding):
+    # S3 hands back the stored (encoded) bytes
+    if content_encoding == 'gzip':
+        return gzip.decompress(body)
+    if content_encoding == 'br':
+        return brotli.decompress(body)
+    return body
+
+
+def put_object_kwargs(body, family, year=None, content_type='text/csv', output_format=None):
+    encoding = 'identity' if output_format in PRECOMPRESSED_FORMATS else content_encoding_for(family)
+    encoded_body, content_encoding = encode_body(body, encoding)
+    kwargs = {
+        'Body': encoded_body,
+        'ContentType': FORMAT_CONTENT_TYPES[output_format] if output_format else content_type,
+        'CacheControl': cache_control_for(family, year),
+    }
+    if content_encoding:
+        kwargs['ContentEncoding'] = content_encoding
+    return kwargs
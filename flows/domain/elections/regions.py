@@ -0,0 +1,69 @@
+# Registry of the regions the flow publishes
+# Each region has its own Drive folder of country workbooks, master sheets and S3 destination, and shares the flow's
+# code, clients, request governors and caches. Regions are defined in regions.json next to this module, or the file
+# named by ELECTION_REGIONS_FILE, e.g.
+#   {"africa": {"results_folder_id": "...", "master_sheet_id": "...", "term_limits_sheet_id": "...",
+#               "directory_sheet_id": "...", "bucket": "stears-flourish-data", "key_prefix": ""}}
+# Regions sharing a bucket need different key_prefixes
+import json
+import os
+
+REGIONS_FILE = os.environ.get('ELECTION_REGIONS_FILE',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regions.json'))
+REQUIRED_FIELDS = ['results_folder_id', 'master_sheet_id', 'term_limits_sheet_id', 'directory_sheet_id', 'bucket']
+
+
+class Region:
+    def __init__(self, name, results_folder_id, master_sheet_id, term_limits_sheet_id, directory_sheet_id, bucket,
+                 key_prefix='', artifact_prefix=None):
+        self.name = name
+        self.results_folder_id = results_folder_id
+        self.master_sheet_id = master_sheet_id
+        self.term_limits_sheet_id = term_limits_sheet_id
+        self.directory_sheet_id = directory_sheet_id
+        self.bucket = bucket
+        self.key_prefix = key_prefix  # prepended to every object key, e.g. 'asia/'
+        self.artifact_prefix = artifact_prefix or name  # region-wide artifacts are named '<prefix>-upcoming-tracker.csv'
+
+    def key(self, name):
+        return f'{self.key_prefix}{name}'
+
+    def url(self, name):
+        return f'https://{self.bucket}.s3.amazonaws.com/{self.key(name)}'
+
+
+def load_regions(path=None):
+    # {region name: Region} in the order of the config file
+    path = path or REGIONS_FILE
+    with open(path) as f:
+        config = json.load(f)
+    regions = {}
+    for name, fields in config.items():
+        missing = [field for field in REQUIRED_FIELDS if not fields.get(field)]
+        if missing:
+            raise ValueError(f'Region {name} in {path} is missing {missing}')
+        unknown = [field for field in fields if field not in REQUIRED_FIELDS + ['key_prefix', 'artifact_prefix']]
+        if unknown:
+            raise ValueError(f'Region {name} in {path} has unknown fields {unknown}')
+        region = Region(name, **fields)
+        # index.json, term_limits.csv, the rollups and the bundles aren't named by region, so two regions writing
+        # to the same bucket and prefix would overwrite each other's
+        shared = [other.name for other in regions.values()
+                  if (other.bucket, other.key_prefix) == (region.bucket, region.key_prefix)]
+        if shared:
+            raise ValueError(f'Region {name} in {path} publishes to the same bucket and key_prefix as {shared[0]}, '
+                             f'give each region in a shared bucket its own key_prefix')
+        regions[name] = region
+    if not regions:
+        raise ValueError(f'No regions defined in {path}')
+    return regions
+
+
+def select_regions(regions, names=None):
+    # the named regions in config order, every region when no names are given
+    if not names:
+        return list(regions.values())
+    unknown = [name for name in names if name not in regions]
+    if unknown:
+        raise ValueError(f'Unknown regions {unknown}, expected some of {list(regions)}')
+    return [region for name, region in regions.items() if name in names]
@@ -0,0 +1,192 @@
+# Shared request governor for Google Drive and S3 calls
+# Every Drive/S3 request goes through a governor, which applies a token-bucket rate limit, caps the number
+# of requests in flight and retries throttled (429/5xx/SlowDown) responses with jittered exponential backoff.
+# During a flow run each request also holds one of the host's I/O slots, shared with the other runs by priority
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError
+from googleapiclient.errors import HttpError
+
+from domain.elections.scheduling import io_slot
+from domain.elections.tracing import annotate
+
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+DRIVE_RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+S3_THROTTLING_CODES = {'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded',
+                       'TooManyRequestsException', 'RequestTimeout', 'InternalError', 'ServiceUnavailable'}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)  # tokens added per second
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # block until a token is available and return how long we waited
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def is_throttling_error(error):
+    # Google API errors carry the HTTP status, and 403s are only retried for quota reasons
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status in RETRYABLE_HTTP_STATUSES:
+            return True
+        if status == 403:
+            reasons = [detail.get('reason') for detail in (getattr(error, 'error_details', None) or []) if isinstance(detail, dict)]
+            return any(reason in DRIVE_RATE_LIMIT_REASONS for reason in reasons)
+        return False
+
+    # botocore errors carry an error code and the HTTP status
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return code in S3_THROTTLING_CODES or status in RETRYABLE_HTTP_STATUSES
+
+    return isinstance(error, (BotoConnectionError, ConnectionError, TimeoutError))
+
+
+def error_status(error):
+    # the HTTP status of a failed Drive or S3 call, if it got a response
+    if isinstance(error, HttpError):
+        return error.resp.status
+    if isinstance(error, ClientError):
+        return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return None
+
+
+class RequestGovernor:
+    def __init__(self, name, rate, burst, max_in_flight, max_retries=5, base_delay=0.5, max_delay=30.0,
+                 min_rate=0.5):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.configured_rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    @classmethod
+    def from_env(cls, name, rate, burst, max_in_flight):
+        # e.g. ELECTION_DRIVE_RATE=20 ELECTION_DRIVE_MAX_IN_FLIGHT=4
+        prefix = f'ELECTION_{name.upper()}_'
+        return cls(
+            name,
+            rate=float(os.environ.get(prefix + 'RATE', rate)),
+            burst=float(os.environ.get(prefix + 'BURST', burst)),
+            max_in_flight=int(os.environ.get(prefix + 'MAX_IN_FLIGHT', max_in_flight)),
+            max_retries=int(os.environ.get(prefix + 'MAX_RETRIES', os.environ.get('ELECTION_MAX_RETRIES', 5))),
+        )
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls = 0
+            self.failures = 0
+            self.retries = 0
+            self.throttled = 0
+            self.rate_wait_seconds = 0.0
+            self.io_wait_seconds = 0.0
+            self.backoff_seconds = 0.0
+            self.active = 0
+            self.peak_in_flight = 0
+
+    def _record(self, **increments):
+        with self.lock:
+            for field, value in increments.items():
+                setattr(self, field, getattr(self, field) + value)
+
+    def _on_throttled(self):
+        # halve the request rate when the service pushes back, down to a floor
+        with self.bucket.lock:
+            self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+
+    def _on_success(self):
+        # and grow it back slowly while requests succeed
+        with self.bucket.lock:
+            if self.bucket.rate < self.configured_rate:
+                self.bucket.rate = min(self.configured_rate, self.bucket.rate + self.configured_rate / 20)
+
+    def backoff_delay(self, attempt):
+        # full jitter: sleep anywhere between 0 and the capped exponential delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        rate_wait = io_wait = backoff = 0.0  # this call's waits, added to the enclosing trace span
+        while True:
+            waited = self.bucket.acquire()
+            rate_wait += waited
+            self._record(calls=1, rate_wait_seconds=waited)
+            with self.in_flight, io_slot() as slot_wait:
+                io_wait += slot_wait
+                with self.lock:
+                    self.io_wait_seconds += slot_wait
+                    self.active += 1
+                    self.peak_in_flight = max(self.peak_in_flight, self.active)
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                else:
+                    error = None
+                finally:
+                    with self.lock:
+                        self.active -= 1
+
+            if error is None:
+                self._on_success()
+                annotate(retries=attempt, rate_wait_ms=round(rate_wait * 1000, 1), io_wait_ms=round(io_wait * 1000, 1),
+                         backoff_ms=round(backoff * 1000, 1))
+                return result
+
+            if not is_throttling_error(error) or attempt >= self.max_retries:
+                self._record(failures=1)
+                annotate(retries=attempt, rate_wait_ms=round(rate_wait * 1000, 1), io_wait_ms=round(io_wait * 1000, 1),
+                         backoff_ms=round(backoff * 1000, 1), http_status=error_status(error))
+                raise error
+
+            delay = self.backoff_delay(attempt)
+            backoff += delay
+            self._on_throttled()
+            self._record(retries=1, throttled=1, backoff_seconds=delay)
+            print(f'{self.name}: throttled ({error}), retrying in {delay:.2f}s')
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'failures': self.failures,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'rate_wait_seconds': round(self.rate_wait_seconds, 3),
+                'io_wait_seconds': round(self.io_wait_seconds, 3),
+                'backoff_seconds': round(self.backoff_seconds, 3),
+                'peak_in_flight': self.peak_in_flight,
+                'current_rate': round(self.bucket.rate, 3),
+            }
+
+    def report(self):
+        print(f'{self.name} request stats: {self.stats()}')
@@ -0,0 +1,58 @@
+# NumPy-backed presidential results engine for the bar charts
+# Vote shares for every year are computed in one array operation and each year's party column order comes
+# from a single row-wise sort, with 'Other Parties' pinned last
+import numpy as np
+import pandas as pd
+
+META_COLUMNS = 4  # Source, Country, Year, Winning Party; party vote columns follow
+PINNED_LAST = ['Other Parties']
+NOT_AVAILABLE = 'Not available'
+AWAITING_RESULTS = 'Awaiting results'
+
+
+def vote_shares(votes):
+    # percentage of each row's total, rounded to 2dp; rows without any votes stay NaN
+    totals = np.nansum(votes, axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = (votes / totals * 100).round(2)
+    return shares
+
+
+def party_orders(shares, party_columns):
+    # per row: parties by share descending (NaN last, ties in sheet order), pinned parties after everything else
+    pinned = np.broadcast_to(np.isin(np.asarray(party_columns, dtype=object), PINNED_LAST), shares.shape)
+    return np.lexsort((-shares, pinned), axis=1)
+
+
+def year_groups(years):
+    # row positions for each year, in order of first appearance
+    positions = {}
+    for position, year in enumerate(years):
+        positions.setdefault(year, []).append(position)
+    return positions.items()
+
+
+def presidential_results_by_year(results_df, drop_columns=('Year', 'Winning Party'), order_parties=True):
+    # returns [(year, frame)] with one bar chart table per election year
+    meta = results_df.iloc[:, :META_COLUMNS]
+    party_columns = results_df.columns[META_COLUMNS:]
+    votes = results_df.iloc[:, META_COLUMNS:].to_numpy(dtype='float64', na_value=np.nan)
+    shares = vote_shares(votes)
+    orders = party_orders(shares, party_columns) if order_parties else None
+    awaiting = (results_df['Winning Party'] == NOT_AVAILABLE).to_numpy()
+    keep_columns = [col for col in meta.columns if col not in drop_columns]
+
+    charts = []
+    for year, positions in year_groups(results_df['Year'].tolist()):
+        year_meta = meta.iloc[positions][keep_columns]
+        first = positions[0]
+        if awaiting[first]:
+            # no results yet, a single full bar
+            chart = year_meta.assign(**{AWAITING_RESULTS: 100})
+        else:
+            order = orders[first] if order_parties else np.arange(len(party_columns))
+            party_shares = pd.DataFrame(shares[positions][:, order], columns=party_columns[order],
+                                        index=year_meta.index)
+            chart = pd.concat([year_meta, party_shares], axis=1)
+        charts.append((year, chart))
+    return charts
@@ -0,0 +1,92 @@
+# Incrementally maintained cross-country rollup tables
+# A rollup (election-representativeness.csv, voter-metrics.csv, presidential-results.csv) combines one partial table
+# per country. Each partial is computed from the country's workbook, sorted like the rollup and kept in the snapshot
+# store under rollup-<name>-<file ID>, keyed by the workbook's checksum, so a country's contribution is only
+# recomputed when its workbook changed. Publishing concatenates the partials in country order and sorts them once
+# (stable, ties in country order), filling in the countries a run didn't load from their stored partials, so a run
+# narrowed to some countries can still publish the rollup
+import pandas as pd
+
+
+class Rollup:
+    def __init__(self, name, key, family, sheet, partial, sort_by='Year', ascending=False, version=1):
+        self.name = name
+        self.key = key  # the published file name
+        self.family = family
+        self.sheet = sheet  # the country workbook sheet the partial is computed from
+        self.partial = partial  # (sheet frame, country name) -> the country's rows
+        self.sort_by = sort_by  # a numeric column, missing and non-numeric values last
+        self.ascending = ascending
+        self.version = version  # bump when partial changes so stored partials are recomputed
+
+    def partial_id(self, file_id):
+        return f'rollup-{self.name}-{file_id}'
+
+    def partial_checksum(self, checksum):
+        return f'{checksum}-v{self.version}'
+
+
+def numeric(values):
+    # the rollup's column as numbers, text that isn't a number (e.g. a '2023 (rerun)' year) sorts with the missing
+    return pd.to_numeric(values, errors='coerce')
+
+
+def sort_rows(df, rollup):
+    # stable, so rows with equal keys keep their order
+    if rollup.sort_by not in df.columns:
+        return df
+    key = None if pd.api.types.is_numeric_dtype(df[rollup.sort_by]) else numeric
+    return df.sort_values(rollup.sort_by, ascending=rollup.ascending, kind='stable', na_position='last', key=key)
+
+
+def merge_partials(partials, rollup):
+    # one stable sort over the partials concatenated in order, equal keys keep the partials' order
+    frames = [df for df in partials if len(df)]
+    if not frames:
+        return None
+    return sort_rows(pd.concat(frames, ignore_index=True), rollup)
+
+
+class RollupEngine:
+    def __init__(self, store):
+        self.store = store  # a SnapshotStore
+        self.computed = 0
+        self.reused = 0
+
+    def reset_stats(self):
+        self.computed = 0
+        self.reused = 0
+
+    def report(self):
+        print(f'Rollup partials: {self.computed} computed, {self.reused} reused')
+
+    def load(self, rollup, file_id, checksum):
+        # the stored partial, an empty frame for a country without the sheet, None if it was never stored
+        stored = self.store.load(rollup.partial_id(file_id), rollup.partial_checksum(checksum))
+        if stored is None:
+            return None
+        return stored.get('partial', pd.DataFrame())
+
+    def partial(self, rollup, country_name, file_id, checksum, spreadsheet):
+        # the country's partial, reused when its workbook hasn't changed since it was stored
+        if checksum:
+            stored = self.load(rollup, file_id, checksum)
+            if stored is not None:
+                self.reused += 1
+                return stored
+        df = pd.DataFrame()
+        if rollup.sheet in spreadsheet:
+            df = sort_rows(rollup.partial(spreadsheet[rollup.sheet], country_name), rollup)
+        self.computed += 1
+        if checksum:
+            try:
+                self.store.save(rollup.partial_id(file_id), rollup.partial_checksum(checksum),
+                                {'partial': df} if rollup.sheet in spreadsheet else {},
+                                label=f'{country_name} {rollup.name} rollup')
+            except Exception as e:
+                print(f'Failed to store the {rollup.name} rollup partial of {country_name}: {e}')
+        return df
+
+    def combine(self, rollup, partials):
+        # partials: {country name: frame}, merged in country name order
+        return merge_partials([partials[country] for country in sorted(partials)], rollup)
@@ -0,0 +1,78 @@
+# What a flow run refreshes
+# A run can be narrowed to some countries, artifact families and election years, e.g. to republish one country's
+# candidates after an editor fixes the sheet; by default everything is refreshed
+from domain.elections.publisher import ARTIFACT_FAMILIES, FAMILY_CACHE_POLICIES
+
+# families built from the african-level master workbook, the term-limits workbook and the per-country workbooks
+AFRICAN_LEVEL_FAMILIES = ['trackers', 'points', 'maps', 'key-stats']
+TERM_LIMITS_FAMILIES = ['term-limits']
+COUNTRY_WORKBOOK_FAMILIES = ['candidates', 'bar-charts', 'results-maps', 'parliament', 'voter-metrics',
+                             'representativeness']
+# families republished on election nights by the live results deployment
+LIVE_FAMILIES = [family for family in ARTIFACT_FAMILIES if FAMILY_CACHE_POLICIES.get(family) == 'live']
+
+
+def normalize_country(country):
+    # workbook names are lower case ('All-data-Ghana' -> 'ghana'), key stats use the sheet's spelling
+    return str(country).strip().lower()
+
+
+def normalize_year(year):
+    try:
+        return int(float(year))
+    except (TypeError, ValueError):
+        return None
+
+
+class RunSelection:
+    def __init__(self, countries=None, families=None, years=None):
+        unknown = [family for family in families or [] if family not in ARTIFACT_FAMILIES]
+        if unknown:
+            raise ValueError(f'Unknown artifact families {unknown}, expected some of {ARTIFACT_FAMILIES}')
+        self.countries = {normalize_country(country) for country in countries} if countries else None
+        self.families = [family for family in ARTIFACT_FAMILIES if family in families] if families \
+            else list(ARTIFACT_FAMILIES)
+        self.years = {normalize_year(year) for year in years} if years else None
+
+    @property
+    def is_partial(self):
+        return self.countries is not None or self.years is not None or len(self.families) < len(ARTIFACT_FAMILIES)
+
+    def includes_family(self, family):
+        return family in self.families
+
+    def includes_country(self, country):
+        return self.countries is None or normalize_country(country) in self.countries
+
+    def includes_year(self, year):
+        return self.years is None or normalize_year(year) in self.years
+
+    def includes_all_countries_and_years(self):
+        # rollups across countries or years are only rebuilt when nothing they combine was left out
+        return self.countries is None and self.years is None
+
+    def needs_african_level(self):
+        return any(family in self.families for family in AFRICAN_LEVEL_FAMILIES)
+
+    def needs_term_limits(self):
+        return any(family in self.families for family in TERM_LIMITS_FAMILIES)
+
+    def needs_country_workbooks(self):
+        return any(family in self.families for family in COUNTRY_WORKBOOK_FAMILIES)
+
+    def select_countries(self, country_workbooks):
+        # {country: file ID} restricted to the selected countries
+        if self.countries is None:
+            return dict(country_workbooks)
+        missing = sorted(self.countries - {normalize_country(country) for country in country_workbooks})
+        if missing:
+            print(f'No country workbook found for {missing}')
+        return {country: file_id for country, file_id in country_workbooks.items() if self.includes_country(country)}
+
+    def describe(self):
+        if not self.is_partial:
+            return 'full refresh'
+        countries = ', '.join(sorted(self.countries)) if self.countries else 'all countries'
+        years = ', '.join(str(year) for year in sorted(year for year in self.years if year is not None)) \
+            if self.years else 'all years'
+        return f"{', '.join(self.families)} for {countries} ({years})"
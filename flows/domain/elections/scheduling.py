@@ -0,0 +1,194 @@
+# Run priorities and the I/O budget shared by the flow runs on a host
+# main.py serves three deployments: the nightly full refresh (bulk), refreshes of some countries or families
+# (targeted) and election-night results (live). Each run is its own process, so runs coordinate through lock files
+# in ELECTION_SCHEDULING_DIR: a run holds one of its priority's run slots while it runs (ELECTION_<PRIORITY>_MAX_RUNS,
+# the deployment's concurrency limit) and every Drive and S3 request holds one of the host's ELECTION_IO_SLOTS I/O
+# slots. While a higher-priority run is active, lower-priority runs only use the last ELECTION_BACKGROUND_IO_SLOTS
+# slots, so an election-night publish gets first claim on the rest while the bulk work carries on in the background.
+# The locks are flocks, the kernel releases them when a run's process dies
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows), runs don't coordinate
+    fcntl = None
+
+PRIORITIES = ['live', 'targeted', 'bulk']  # highest first
+DEFAULT_PRIORITY = 'bulk'
+SCHEDULING_DIR = os.environ.get('ELECTION_SCHEDULING_DIR', os.path.expanduser('~/.cache/election-scheduling'))
+IO_SLOTS = int(os.environ.get('ELECTION_IO_SLOTS', 24))
+BACKGROUND_IO_SLOTS = int(os.environ.get('ELECTION_BACKGROUND_IO_SLOTS', 4))
+RUN_LIMITS = {
+    'live': int(os.environ.get('ELECTION_LIVE_MAX_RUNS', 1)),
+    'targeted': int(os.environ.get('ELECTION_TARGETED_MAX_RUNS', 2)),
+    'bulk': int(os.environ.get('ELECTION_BULK_MAX_RUNS', 1)),
+}
+PRIORITY_CHECK_SECONDS = 1.0  # how long a run trusts its last look at the higher-priority runs
+RUN_SLOT_POLL_SECONDS = 5.0
+
+settings = {
+    'enabled': False,  # only flow runs coordinate, scripts and benchmarks calling the governors don't
+    'priority': DEFAULT_PRIORITY,
+}
+
+
+class LockSlots:
+    # <name>-0.lock ... <name>-<count - 1>.lock, a slot is taken while some process holds its flock
+    def __init__(self, directory, name, count):
+        self.directory = directory
+        self.name = name
+        self.count = count
+        self.files = {}  # index -> open file, reused between requests
+        self.held = set()  # indexes this process holds, threads sharing a file would share its flock
+        self.lock = threading.Lock()
+
+    def file(self, index):
+        if index not in self.files:
+            os.makedirs(self.directory, exist_ok=True)
+            self.files[index] = open(os.path.join(self.directory, f'{self.name}-{index}.lock'), 'a')
+        return self.files[index]
+
+    def try_acquire(self, indexes):
+        # the first free slot among indexes, or None
+        with self.lock:
+            for index in indexes:
+                if index in self.held:
+                    continue
+                try:
+                    fcntl.flock(self.file(index).fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                self.held.add(index)
+                return index
+        return None
+
+    def release(self, index):
+        with self.lock:
+            fcntl.flock(self.file(index).fileno(), fcntl.LOCK_UN)
+            self.held.discard(index)
+
+
+class HostScheduler:
+    def __init__(self, directory=None, io_slots=None, background_slots=None, run_limits=None):
+        self.directory = directory or SCHEDULING_DIR
+        self.io_slots = IO_SLOTS if io_slots is None else io_slots
+        self.background_slots = min(self.io_slots, BACKGROUND_IO_SLOTS if background_slots is None
+                                    else background_slots)
+        self.run_limits = run_limits or RUN_LIMITS
+        self.available = fcntl is not None and self.io_slots > 0
+        self.io = LockSlots(self.directory, 'io', self.io_slots)
+        self.runs = {priority: LockSlots(self.directory, f'runs-{priority}', limit)
+                     for priority, limit in self.run_limits.items()}
+        self.announcement = None
+        self.checked = {}  # priority -> (monotonic time of the last look, whether a higher priority was active)
+        self.lock = threading.Lock()
+
+    def announce(self, priority):
+        # hold a shared lock on active-<priority>.lock while the run is active, lower priorities look for it
+        os.makedirs(self.directory, exist_ok=True)
+        self.announcement = open(os.path.join(self.directory, f'active-{priority}.lock'), 'a')
+        fcntl.flock(self.announcement.fileno(), fcntl.LOCK_SH)
+
+    def withdraw(self):
+        if self.announcement is not None:
+            self.announcement.close()
+            self.announcement = None
+
+    def higher_priority_active(self, priority):
+        # whether any run of a higher priority is active on the host, looked up at most once a second
+        with self.lock:
+            now = time.monotonic()
+            checked_at, yielding = self.checked.get(priority, (None, False))
+            if checked_at is not None and now - checked_at < PRIORITY_CHECK_SECONDS:
+                return yielding
+            yielding = False
+            for level in PRIORITIES[:PRIORITIES.index(priority)]:
+                path = os.path.join(self.directory, f'active-{level}.lock')
+                if not os.path.exists(path):
+                    continue
+                with open(path, 'a') as f:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        yielding = True
+                        break
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            self.checked[priority] = (now, yielding)
+            return yielding
+
+    def io_indexes(self, priority):
+        # higher priorities take slots from the front, a run yielding to one only uses the last background slots
+        if self.higher_priority_active(priority):
+            return range(self.io_slots - self.background_slots, self.io_slots)
+        return range(self.io_slots)
+
+    @contextmanager
+    def io_slot(self, priority):
+        # hold one of the host's I/O slots, yields the seconds spent waiting for it
+        waited = 0.0
+        while True:
+            index = self.io.try_acquire(self.io_indexes(priority))
+            if index is not None:
+                break
+            wait = random.uniform(0.005, 0.02)
+            time.sleep(wait)
+            waited += wait
+        try:
+            yield waited
+        finally:
+            self.io.release(index)
+
+    @contextmanager
+    def run_slot(self, priority):
+        # hold one of the priority's run slots for the whole run, waiting while the limit is reached
+        slots = self.runs[priority]
+        announced_wait = False
+        while True:
+            index = slots.try_acquire(range(slots.count))
+            if index is not None:
+                break
+            if not announced_wait:
+                print(f'{slots.count} {priority} run(s) already running, waiting for one to finish')
+                announced_wait = True
+            time.sleep(RUN_SLOT_POLL_SECONDS)
+        self.announce(priority)
+        try:
+            yield
+        finally:
+            self.withdraw()
+            slots.release(index)
+
+
+host_scheduler = HostScheduler()
+
+
+def configure(priority=None):
+    # called at the start of each flow run
+    priority = priority or DEFAULT_PRIORITY
+    if priority not in PRIORITIES:
+        raise ValueError(f'Unknown priority {priority!r}, expected one of {PRIORITIES}')
+    settings['priority'] = priority
+    settings['enabled'] = host_scheduler.available
+
+
+@contextmanager
+def run_slot():
+    if not settings['enabled']:
+        yield
+        return
+    with host_scheduler.run_slot(settings['priority']):
+        yield
+
+
+@contextmanager
+def io_slot():
+    # a Drive or S3 request's share of the host I/O budget, yields the seconds spent waiting for it
+    if not settings['enabled']:
+        yield 0.0
+        return
+    with host_scheduler.io_slot(settings['priority']) as waited:
+        yield waited
@@ -0,0 +1,138 @@
+# Schema registry for every sheet the pipeline reads
+# Each schema lists the columns the generators rely on and the compact dtypes to load them with (categoricals for
+# repeated labels, nullable integers for counts, parsed dates), applied once when a workbook is loaded
+import numpy as np
+import pandas as pd
+
+from domain.elections.date_derivations import (
+    CURRENT_DEMOCRACY_DATE, FIRST_ELECTION_DATE, PRES_BIRTH_DATE, PRES_DATE_FORMATS, PRES_START_DATE, parse_dates)
+
+
+class SchemaDriftError(ValueError):
+    pass
+
+
+def is_whole(values):
+    values = np.asarray(values, dtype='float64')
+    return np.array_equal(values, np.trunc(values))
+
+
+class SheetSchema:
+    def __init__(self, name, required_columns=(), categorical=(), nullable_int=(), dates=None,
+                 nullable_int_from=None, compact_int_from=None):
+        self.name = name
+        self.required_columns = list(required_columns)
+        self.categorical = list(categorical)
+        self.nullable_int = list(nullable_int)
+        self.dates = dates or {}  # column -> formats tried in order
+        # party/coalition columns vary per country, so they are typed by position
+        self.nullable_int_from = nullable_int_from  # whole-number columns become Int64, missing stays missing
+        self.compact_int_from = compact_int_from  # missing is 0, stored in the smallest int type that fits
+
+    def positional_columns(self, df, start):
+        if start is None:
+            return []
+        return [col for col in df.columns[start:] if col != 'Year'
+                and pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+
+    def apply(self, df, label=None):
+        where = f"'{self.name}' sheet" + (f" of {label}" if label else '')
+        missing = [col for col in self.required_columns if col not in df.columns]
+        if missing:
+            raise SchemaDriftError(f"{where} is missing expected columns {missing}, found {list(df.columns)}")
+
+        df = df.copy()
+        for col in self.categorical:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+
+        for col in self.nullable_int:
+            if col in df.columns:
+                df[col] = self.to_integers(df[col], col, where).astype('Int64')
+
+        for col in self.positional_columns(df, self.nullable_int_from):
+            if is_whole(df[col].dropna()):
+                df[col] = df[col].astype('Int64')
+
+        # vote counts only: a column with fractions (shares, percentages) would be truncated by the cast
+        compact = self.positional_columns(df, self.compact_int_from)
+        fractional = [col for col in compact if not is_whole(df[col].dropna())]
+        if fractional:
+            raise SchemaDriftError(f"{where}: columns {fractional} should only hold whole numbers, casting them to "
+                                   f"integers would truncate their fractions")
+        for col in compact:
+            df[col] = pd.to_numeric(df[col].fillna(0).astype('int64'), downcast='integer')
+
+        for col, formats in self.dates.items():
+            if col in df.columns:
+                df[col] = parse_dates(df[col], formats, sentinels=[])
+        return df
+
+    def to_integers(self, values, col, where):
+        numbers = pd.to_numeric(values, errors='coerce')
+        if (numbers.isna() & values.notna()).any():
+            raise SchemaDriftError(f"{where}: column '{col}' should only hold numbers")
+        if not is_whole(numbers.dropna()):
+            raise SchemaDriftError(f"{where}: column '{col}' should only hold whole numbers")
+        return numbers
+
+
+SCHEMAS = {schema.name: schema for schema in [
+    # master sheets
+    SheetSchema('elections', required_columns=['Country', 'Date', 'Type', 'Description', 'Date (placeholder)'],
+                categorical=['Country', 'Type']),
+    SheetSchema('countries',
+                required_columns=['Country', 'Stears URL', 'Longitude', 'Latitude', CURRENT_DEMOCRACY_DATE,
+                                  FIRST_ELECTION_DATE, 'Democracy age note', 'State of Civilian Rule',
+                                  'System of government label', 'Who runs the government?', 'How are they elected?',
+                                  'Regional govts have autonomy?', 'Legislature?', PRES_BIRTH_DATE, PRES_START_DATE],
+                categorical=['Country', 'State of Civilian Rule'],
+                dates={PRES_BIRTH_DATE: PRES_DATE_FORMATS, PRES_START_DATE: PRES_DATE_FORMATS}),
+    SheetSchema('population', required_columns=['Country', 'Population'], categorical=['Country'],
+                nullable_int=['Population']),
+    SheetSchema('gdp', required_columns=['Country', 'GDP'], categorical=['Country'], nullable_int=['GDP']),
+    SheetSchema('democracy_level', required_columns=['Country', 'Democracy'], categorical=['Country', 'Democracy']),
+    SheetSchema('Term_limits',
+                required_columns=['Country', 'President name', 'Status', 'Start Year', 'End Year',
+                                  'Number of terms served', 'Term limit', 'Term length', 'Historical Context'],
+                categorical=['Country', 'Status']),
+    SheetSchema('Directory', required_columns=['Name', 'Website']),
+
+    # country workbooks
+    SheetSchema('Candidates',
+                required_columns=['Source', 'Name', 'Headshot URL', 'Birth Date', 'Gender', 'Party', 'Coalition',
+                                  'Year', 'Previous Positions', 'Display', 'Winner'],
+                categorical=['Gender', 'Display', 'Winner']),
+    SheetSchema('Pres-Results-Total', required_columns=['Year', 'Winning Party'], categorical=['Winning Party'],
+                nullable_int_from=4),
+    SheetSchema('Pres-Election-Results', required_columns=['Source', 'Year', 'Winning Party'],
+                categorical=['Winning Party'], nullable_int_from=4),
+    SheetSchema('Pres-Results-Subnational', required_columns=['Year'], compact_int_from=2),
+    SheetSchema('Legislative-Control', required_columns=['Year', 'Parliament Type'],
+                categorical=['Parliament Type'], nullable_int_from=4),
+    SheetSchema('Voter-Metrics'),  # read by position, the first 14 columns are published as they are
+    SheetSchema('Election-Representativeness',
+                required_columns=['Country', 'Year', 'Source', 'Observer Group',
+                                  'PVT: Was the winning party the same?',
+                                  'PVT: Would the discrepancy have changed who won the overall election results?',
+                                  'PVT: For the winning party, what was the percentage point difference in vote share '
+                                  'between PVT and official results?']),
+]}
+
+
+def apply_schemas(sheets, label=None, strict=True):
+    # type every registered sheet; unregistered sheets are passed through untouched
+    # a drifted sheet raises when strict, otherwise it is reported and left out so only that sheet is skipped
+    typed = {}
+    for sheet_name, df in sheets.items():
+        schema = SCHEMAS.get(sheet_name)
+        if schema is None:
+            typed[sheet_name] = df
+            continue
+        try:
+            typed[sheet_name] = schema.apply(df, label=label)
+        except SchemaDriftError as e:
+            if strict:
+                raise
+            print(f"Schema drift: {e}")
+    return typed
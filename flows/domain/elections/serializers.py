@@ -0,0 +1,167 @@
+# Serializers for published artifacts
+# The fast CSV writer formats each column once (the way DataFrame.to_csv does) and streams the rows through the csv
+# module straight into a reusable UTF-8 byte buffer; frames it can't reproduce byte for byte go through pandas.
+# JSON and Parquet bodies are written from the same frame and keep its column types
+import csv
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, parquet outputs are skipped without it
+    pa = None
+    pq = None
+
+# fast or pandas; ELECTION_CSV_VERIFY=1 also writes every body with pandas and uses that one on any difference.
+# tests/test_serializers.py checks the fast writer against what to_csv wrote for every artifact family
+CSV_SERIALIZER = os.environ.get('ELECTION_CSV_SERIALIZER', 'fast')
+CSV_VERIFY = os.environ.get('ELECTION_CSV_VERIFY', '0') == '1'
+
+buffers = threading.local()
+
+
+class UnsupportedFrame(Exception):
+    pass
+
+
+def pandas_csv_bytes(df, header=True):
+    return df.to_csv(index=False, header=header).encode('utf-8')
+
+
+def reusable_writer():
+    # one byte buffer and text wrapper per thread, emptied before every artifact
+    if not hasattr(buffers, 'text'):
+        buffers.raw = io.BytesIO()
+        buffers.text = io.TextIOWrapper(buffers.raw, encoding='utf-8', newline='', write_through=True)
+    buffers.text.seek(0)
+    buffers.text.truncate(0)
+    return buffers.text, buffers.raw
+
+
+def column_values(series):
+    # the values to_csv would write for one column, missing values as ''; works on the numpy arrays since the
+    # per-call overhead of Series methods is most of the cost on our small frames
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories.to_numpy(dtype=object)
+        codes = series.cat.codes.to_numpy()
+        if not len(categories):
+            return [''] * len(codes)
+        return np.where(codes < 0, '', categories.take(codes)).tolist()
+    if not isinstance(dtype, np.dtype):
+        if pd.api.types.is_integer_dtype(dtype):  # Int64 and the other nullable integers
+            return series.to_numpy(dtype=object, na_value='').tolist()
+        raise UnsupportedFrame(f'column {series.name!r} has dtype {dtype}')
+    values = series.to_numpy()
+    if dtype.kind in 'iub':
+        return values.tolist()
+    if dtype.kind == 'f':
+        return np.where(np.isnan(values), '', values.astype(str)).tolist()  # numpy's shortest repr, as pandas uses
+    if dtype == object:
+        missing = pd.isna(values)
+        return np.where(missing, '', values).tolist() if missing.any() else values.tolist()
+    raise UnsupportedFrame(f'column {series.name!r} has dtype {dtype}')
+
+
+def fast_csv_bytes(df, header=True):
+    if isinstance(df.columns, pd.MultiIndex) or len(df.columns) == 0 or not df.columns.is_unique:
+        raise UnsupportedFrame('columns are not a flat, unique list')
+    columns = [column_values(series) for _, series in df.items()]
+    text, raw = reusable_writer()
+    writer = csv.writer(text, lineterminator='\n')
+    if header:
+        writer.writerow(list(df.columns))
+    writer.writerows(zip(*columns))
+    return raw.getvalue()
+
+
+SERIALIZERS = {
+    'fast': fast_csv_bytes,
+    'pandas': pandas_csv_bytes,
+}
+
+
+def to_csv_bytes(df, header=True, serializer=None):
+    # UTF-8 CSV body for an artifact, byte for byte what df.to_csv(index=False) gives
+    serializer = serializer or CSV_SERIALIZER
+    try:
+        body = SERIALIZERS[serializer](df, header=header)
+    except UnsupportedFrame:
+        return pandas_csv_bytes(df, header=header)
+    if CSV_VERIFY and serializer != 'pandas':
+        expected = pandas_csv_bytes(df, header=header)
+        if body != expected:
+            print(f'{serializer} CSV writer differs from pandas for columns {list(df.columns)}, using pandas')
+            return expected
+    return body
+
+
+def json_column(series):
+    # typed values for one column, missing values as null
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return [value.isoformat() if pd.notna(value) else None for value in series]
+    values = series.to_numpy(dtype=object, na_value=None) if not isinstance(series.dtype, np.dtype) \
+        else series.to_numpy()
+    if values.dtype == object or values.dtype.kind == 'f':
+        missing = pd.isna(values)
+        if missing.any():
+            values = np.where(missing, None, values.astype(object))
+    return values.tolist()
+
+
+def to_json_table(df):
+    # compact column-oriented table, {"columns": [...], "data": [[first column values], ...]}; column names keep
+    # their type, so a year header stays a number
+    return {
+        'columns': [name.item() if isinstance(name, np.generic) else name for name in df.columns],
+        'data': [json_column(series) for _, series in df.items()],
+    }
+
+
+def to_json_bytes(df):
+    return json.dumps(to_json_table(df), separators=(',', ':'), ensure_ascii=False, allow_nan=False,
+                      default=str).encode('utf-8')
+
+
+def to_parquet_bytes(df):
+    if pq is None:
+        raise RuntimeError('pyarrow is not installed')
+    df = df.set_axis([str(name) for name in df.columns], axis=1)  # parquet column names are strings
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # object columns that mix text and numbers are stored as text
+        mixed = df.select_dtypes(include=['object']).columns
+        df = df.astype({col: 'string' for col in mixed})
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression='zstd')
+    return sink.getvalue().to_pybytes()
+
+
+FORMAT_SERIALIZERS = {
+    'json': to_json_bytes,
+    'parquet': to_parquet_bytes,
+}
+
+
+def serialize_frame(df, output_formats, header=True):
+    # {format: body} for every requested format, all written from the same frame
+    bodies = {}
+    for output_format in output_formats:
+        if output_format == 'csv':
+            bodies['csv'] = to_csv_bytes(df, header=header)
+            continue
+        try:
+            bodies[output_format] = FORMAT_SERIALIZERS[output_format](df)
+        except Exception as e:
+            print(f'Failed to write {output_format} for columns {list(df.columns)}: {e}')
+    return bodies
@@ -0,0 +1,223 @@
+# Local columnar snapshots of parsed workbooks
+# Each workbook is stored as <root>/<file_id>/<checksum>/ with one Arrow (feather) file per sheet and a
+# manifest.json that keeps the sheet order, the original column labels and the Drive file name. The snapshots are
+# what later flow runs reuse; within a run, the typed sheets of the workbooks already loaded are also kept in memory
+# (an LRU bounded by ELECTION_SNAPSHOT_MEMO_MB) so the generators loading the same workbook don't read and type it
+# again
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, sheets fall back to pickle
+    feather = None
+
+SNAPSHOT_DIR = os.environ.get('ELECTION_SNAPSHOT_DIR',
+                              os.path.join(os.path.expanduser('~'), '.cache', 'election-snapshots'))
+MANIFEST_NAME = 'manifest.json'
+SNAPSHOT_MEMO_MAX_BYTES = int(float(os.environ.get('ELECTION_SNAPSHOT_MEMO_MB', 512)) * 1024 * 1024)
+
+
+def encode_label(label):
+    # column labels from Excel can be strings, numbers or dates, keep the type so they round trip
+    if isinstance(label, (bool, np.bool_)):
+        return ['bool', bool(label)]
+    if isinstance(label, (int, np.integer)):
+        return ['int', int(label)]
+    if isinstance(label, (float, np.floating)):
+        return ['float', float(label)]
+    if isinstance(label, (pd.Timestamp, np.datetime64)):
+        return ['timestamp', pd.Timestamp(label).isoformat()]
+    return ['str', str(label)]
+
+
+def decode_label(encoded):
+    kind, value = encoded
+    if kind == 'timestamp':
+        return pd.Timestamp(value)
+    return value
+
+
+def workbook_nbytes(sheets):
+    return int(sum(df.memory_usage(index=True, deep=True).sum() for df in sheets.values()))
+
+
+class SnapshotMemo:
+    # the run's in-memory LRU of typed workbooks, keyed by (file ID, checksum) and evicted by size
+    def __init__(self, max_bytes=SNAPSHOT_MEMO_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (sheets, nbytes), least recently used first
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            sheets = entry[0]
+        # generators modify their frames in place, so every caller gets its own copy
+        return {sheet_name: df.copy() for sheet_name, df in sheets.items()}
+
+    def put(self, key, sheets):
+        sheets = {sheet_name: df.copy() for sheet_name, df in sheets.items()}
+        nbytes = workbook_nbytes(sheets)
+        if nbytes > self.max_bytes:
+            return  # a single workbook bigger than the whole memo is never kept
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= self.entries.pop(key)[1]
+            # drop older versions of the same file
+            for stale_key in [k for k in self.entries if k[0] == key[0]]:
+                self.current_bytes -= self.entries.pop(stale_key)[1]
+            self.entries[key] = (sheets, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class SnapshotStore:
+    def __init__(self, root=SNAPSHOT_DIR, keep=3, memo_bytes=SNAPSHOT_MEMO_MAX_BYTES):
+        self.root = root
+        self.keep = keep  # number of checksums kept per file
+        self.memo = SnapshotMemo(memo_bytes)
+
+    def recall(self, file_id, checksum):
+        # the typed sheets this run already loaded for the checksum, or None
+        return self.memo.get((file_id, checksum))
+
+    def remember(self, file_id, checksum, sheets):
+        self.memo.put((file_id, checksum), sheets)
+
+    def report(self):
+        print(f'snapshot memo stats: {self.memo.stats()}')
+
+    def path(self, file_id, checksum):
+        return os.path.join(self.root, file_id, checksum)
+
+    def has(self, file_id, checksum):
+        return os.path.exists(os.path.join(self.path(file_id, checksum), MANIFEST_NAME))
+
+    def latest_checksum(self, file_id):
+        file_dir = os.path.join(self.root, file_id)
+        if not os.path.isdir(file_dir):
+            return None
+        snapshots = [name for name in os.listdir(file_dir) if not name.startswith('.') and self.has(file_id, name)]
+        if not snapshots:
+            return None
+        return max(snapshots, key=lambda name: os.path.getmtime(os.path.join(file_dir, name, MANIFEST_NAME)))
+
+    def find(self, label):
+        # look a workbook up by its Drive file name (e.g. 'nigeria') for local debugging
+        if not os.path.isdir(self.root):
+            return None
+        for file_id in os.listdir(self.root):
+            checksum = self.latest_checksum(file_id)
+            if checksum and self.read_manifest(file_id, checksum).get('label') == label:
+                return file_id
+        return None
+
+    def read_manifest(self, file_id, checksum):
+        with open(os.path.join(self.path(file_id, checksum), MANIFEST_NAME)) as f:
+            return json.load(f)
+
+    def streamed_sheets(self, file_id, checksum):
+        # sheets left out of the snapshot because they were spooled elsewhere (see subnational.py)
+        return self.read_manifest(file_id, checksum).get('streamed', [])
+
+    def save(self, file_id, checksum, sheets, label=None, streamed=None):
+        if self.has(file_id, checksum):
+            return
+        os.makedirs(os.path.join(self.root, file_id), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=os.path.join(self.root, file_id))
+        manifest = {'file_id': file_id, 'checksum': checksum, 'label': label, 'saved_at': time.time(), 'sheets': [],
+                    'streamed': list(streamed or [])}
+
+        for position, (sheet_name, df) in enumerate(sheets.items()):
+            entry = {'name': sheet_name, 'columns': [encode_label(col) for col in df.columns]}
+            stored = df.copy(deep=False)
+            stored.columns = [str(i) for i in range(len(df.columns))]
+            stored = stored.reset_index(drop=True)
+
+            entry['format'] = 'pickle'
+            if feather is not None:
+                try:
+                    # uncompressed Arrow so it can be memory-mapped on load
+                    feather.write_feather(stored, os.path.join(staging, f'{position}.arrow'), compression='uncompressed')
+                    entry['format'] = 'arrow'
+                except Exception:
+                    pass  # mixed-type object columns can't be stored as Arrow
+            if entry['format'] == 'pickle':
+                stored.to_pickle(os.path.join(staging, f'{position}.pkl'))
+            manifest['sheets'].append(entry)
+
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(staging, self.path(file_id, checksum))
+        except OSError:  # another run saved the same snapshot first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.prune(file_id)
+
+    def load(self, file_id, checksum=None):
+        # returns {sheet_name: DataFrame} in workbook order, or None if there is no snapshot
+        checksum = checksum or self.latest_checksum(file_id)
+        if checksum is None or not self.has(file_id, checksum):
+            return None
+        snapshot_dir = self.path(file_id, checksum)
+        manifest = self.read_manifest(file_id, checksum)
+
+        sheets = {}
+        for position, entry in enumerate(manifest['sheets']):
+            if entry['format'] == 'arrow':
+                table = feather.read_table(os.path.join(snapshot_dir, f'{position}.arrow'), memory_map=True)
+                df = table.to_pandas()
+                # Arrow gives None for missing strings, pandas/openpyxl gives NaN
+                for col in df.columns[df.dtypes == object]:
+                    df[col] = df[col].where(df[col].notna(), np.nan)
+            else:
+                df = pd.read_pickle(os.path.join(snapshot_dir, f'{position}.pkl'))
+            df.columns = [decode_label(col) for col in entry['columns']]
+            sheets[entry['name']] = df
+        return sheets
+
+    def prune(self, file_id):
+        file_dir = os.path.join(self.root, file_id)
+        snapshots = sorted((name for name in os.listdir(file_dir) if not name.startswith('.') and self.has(file_id, name)),
+                           key=lambda name: os.path.getmtime(os.path.join(file_dir, name, MANIFEST_NAME)),
+                           reverse=True)
+        for name in snapshots[self.keep:]:
+            shutil.rmtree(os.path.join(file_dir, name), ignore_errors=True)
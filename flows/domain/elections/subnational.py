@@ -0,0 +1,199 @@
+# Chunked path for large subnational results sheets
+# A ward or polling-unit level 'Pres-Results-Subnational' sheet can hold hundreds of thousands of rows with dozens of
+# party columns, too many to parse with the rest of the workbook. A sheet longer than ELECTION_SUBNATIONAL_STREAM_ROWS
+# is read row by row with openpyxl in read-only mode and spooled to disk by election year, flushing every
+# ELECTION_SUBNATIONAL_CHUNK_ROWS rows, in <root>/<file_id>/<checksum>/ with a manifest.json of the header and years.
+# Each year is then parsed on its own the way pd.read_excel parses a sheet and typed by the sheet's schema (vote counts
+# in the smallest integer type), so generate_results_maps holds one year's slice at a time
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+from domain.elections.schemas import SCHEMAS, SchemaDriftError
+from domain.elections.snapshot_store import decode_label, encode_label
+
+SUBNATIONAL_SHEET = 'Pres-Results-Subnational'
+STREAM_ROWS = int(os.environ.get('ELECTION_SUBNATIONAL_STREAM_ROWS', 50000))
+CHUNK_ROWS = int(os.environ.get('ELECTION_SUBNATIONAL_CHUNK_ROWS', 20000))
+SUBNATIONAL_DIR = os.environ.get('ELECTION_SUBNATIONAL_DIR',
+                                 os.path.join(os.path.expanduser('~'), '.cache', 'election-subnational'))
+MANIFEST_NAME = 'manifest.json'
+
+
+def convert_cell(cell):
+    # what pandas' openpyxl reader makes of a cell, so a streamed sheet parses like pd.read_excel
+    if cell.value is None:
+        return ''
+    if cell.data_type == TYPE_ERROR:
+        return float('nan')
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def convert_row(row):
+    values = [convert_cell(cell) for cell in row]
+    while values and values[-1] == '':
+        values.pop()
+    return values
+
+
+def sheets_to_parse(source):
+    # None to parse every sheet as usual, or the other sheets' names when the subnational sheet should be streamed;
+    # read-only workbooks take the row count from the sheet's dimension, a sheet without one is streamed
+    workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        if SUBNATIONAL_SHEET not in workbook.sheetnames:
+            return None
+        max_row = workbook[SUBNATIONAL_SHEET].max_row
+        if max_row is not None and max_row <= STREAM_ROWS:
+            return None
+        return [name for name in workbook.sheetnames if name != SUBNATIONAL_SHEET]
+    finally:
+        workbook.close()
+
+
+def parse_rows(header, rows, width):
+    # one year's rows as pd.read_excel would have parsed them (number inference, NA strings, 'Unnamed: n' headers)
+    def padded(values):
+        return list(values) + [''] * (width - len(values))
+
+    return TextParser([padded(header)] + [padded(values) for values in rows], header=0,
+                      skip_blank_lines=False).read()
+
+
+def read_chunks(path):
+    # the row lists appended to a year's spool file
+    rows = []
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                rows.extend(pickle.load(f))
+            except EOFError:
+                return rows
+
+
+class SubnationalStore:
+    def __init__(self, root=SUBNATIONAL_DIR, keep=3):
+        self.root = root
+        self.keep = keep  # number of checksums kept per file
+
+    def path(self, file_id, checksum):
+        return os.path.join(self.root, file_id, checksum)
+
+    def has(self, file_id, checksum):
+        return os.path.exists(os.path.join(self.path(file_id, checksum), MANIFEST_NAME))
+
+    def latest_checksum(self, file_id):
+        file_dir = os.path.join(self.root, file_id)
+        if not os.path.isdir(file_dir):
+            return None
+        spools = [name for name in os.listdir(file_dir) if not name.startswith('.') and self.has(file_id, name)]
+        if not spools:
+            return None
+        return max(spools, key=lambda name: os.path.getmtime(os.path.join(file_dir, name, MANIFEST_NAME)))
+
+    def read_manifest(self, file_id, checksum):
+        with open(os.path.join(self.path(file_id, checksum), MANIFEST_NAME)) as f:
+            return json.load(f)
+
+    def save(self, file_id, checksum, source, label=None):
+        # stream the sheet and append each chunk's rows to their year's spool file, years kept in sheet order
+        if self.has(file_id, checksum):
+            return
+        os.makedirs(os.path.join(self.root, file_id), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=os.path.join(self.root, file_id))
+        years = {}  # year -> {'year', 'rows', 'position'}
+        files = {}
+        buffered = {}
+        buffered_rows = 0
+
+        def flush():
+            for year, rows in buffered.items():
+                if year not in files:
+                    files[year] = open(os.path.join(staging, f"{years[year]['position']}.pkl"), 'wb')
+                pickle.dump(rows, files[year], protocol=pickle.HIGHEST_PROTOCOL)
+            buffered.clear()
+
+        workbook = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+        try:
+            rows = workbook[SUBNATIONAL_SHEET].iter_rows()
+            header = convert_row(next(rows, ()))
+            if 'Year' not in header:
+                where = f"'{SUBNATIONAL_SHEET}' sheet" + (f" of {label}" if label else '')
+                raise SchemaDriftError(f"{where} is missing expected columns ['Year'], found {header}")
+            year_position = header.index('Year')
+            width = len(header)
+            blank_rows = 0  # blank rows are kept like pd.read_excel keeps them, unless they end the sheet
+            for row in rows:
+                values = convert_row(row)
+                if not values:
+                    blank_rows += 1
+                    continue
+                pending = [[]] * blank_rows + [values]
+                blank_rows = 0
+                width = max(width, len(values))
+                for values in pending:
+                    year = str(values[year_position]) if year_position < len(values) else ''
+                    if year not in years:
+                        years[year] = {'year': year, 'rows': 0, 'position': len(years)}
+                    years[year]['rows'] += 1
+                    buffered.setdefault(year, []).append(values)
+                    buffered_rows += 1
+                if buffered_rows >= CHUNK_ROWS:
+                    flush()
+                    buffered_rows = 0
+            flush()
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        finally:
+            workbook.close()
+            for f in files.values():
+                f.close()
+
+        manifest = {'file_id': file_id, 'checksum': checksum, 'label': label, 'saved_at': time.time(),
+                    'header': [encode_label(value) for value in header], 'width': width,
+                    'years': sorted(years.values(), key=lambda entry: entry['position'])}
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(staging, self.path(file_id, checksum))
+        except OSError:  # another run spooled the same sheet first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.prune(file_id)
+
+    def years(self, file_id, checksum, label=None, include=None):
+        # yields each year's rows of the sheet as a typed frame, one at a time; include(year) skips years unparsed
+        snapshot_dir = self.path(file_id, checksum)
+        manifest = self.read_manifest(file_id, checksum)
+        header = [decode_label(value) for value in manifest['header']]
+        schema = SCHEMAS[SUBNATIONAL_SHEET]
+        # rows without a year make pd.read_excel parse the whole Year column as floats, so years are too here
+        blank_years = any(entry['year'] == '' for entry in manifest['years'])
+        for entry in manifest['years']:
+            if include is not None and not include(entry['year']):
+                continue
+            rows = read_chunks(os.path.join(snapshot_dir, f"{entry['position']}.pkl"))
+            df = parse_rows(header, rows, manifest['width'])
+            if blank_years and pd.api.types.is_integer_dtype(df['Year']):
+                df['Year'] = df['Year'].astype('float64')
+            yield schema.apply(df, label=label)
+
+    def prune(self, file_id):
+        file_dir = os.path.join(self.root, file_id)
+        spools = sorted((name for name in os.listdir(file_dir) if not name.startswith('.') and self.has(file_id, name)),
+                        key=lambda name: os.path.getmtime(os.path.join(file_dir, name, MANIFEST_NAME)),
+                        reverse=True)
+        for name in spools[self.keep:]:
+            shutil.rmtree(os.path.join(file_dir, name), ignore_errors=True)
@@ -0,0 +1,67 @@
+# Vectorized term-limits transform
+# Durations and sizing use nullable integers with masked arithmetic, and leader ordinals come from a precomputed
+# suffix lookup instead of per-row apply calls
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# the suffix only depends on n % 30 (n % 10 is determined by it), so 30 entries cover every sequence number
+ORDINAL_SUFFIXES = np.array([
+    'th' if 10 <= n <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th') for n in range(30)
+], dtype=object)
+
+TERM_LIMITS_COLUMNS = [
+    'Country',
+    'Sequence',
+    'President name',
+    'Presidential Sequence',
+    'Status',
+    'Start Year',
+    'End Year',
+    'Duration',
+    'Terms served',
+    'Legal maximum number of terms',
+    'Legal maximum duration of each term',
+    'Historical compliance',
+    'Sizing',
+    'Country-A'
+]
+
+
+def presidential_sequence(sequence):
+    # 1 -> '1st Leader', 2 -> '2nd Leader', 11 -> '11th Leader' ...
+    values = sequence.to_numpy(dtype='int64')
+    suffixes = ORDINAL_SUFFIXES[values % 30]
+    return pd.Series(values.astype(str).astype(object) + suffixes + ' Leader', index=sequence.index)
+
+
+def process_term_limits(term_limits_df, reference_year=None):
+    reference_year = reference_year or datetime.now().year
+    df = term_limits_df.copy()
+
+    df['Sequence'] = df.groupby('Country', observed=True).cumcount() + 1
+    df['Presidential Sequence'] = presidential_sequence(df['Sequence'])
+
+    # Renaming columns
+    df = df.rename(columns={
+        'Number of terms served': 'Terms served',
+        'Term limit': 'Legal maximum number of terms',
+        'Term length': 'Legal maximum duration of each term',
+        'Historical Context': 'Historical compliance'
+    })
+
+    # incumbents have served up to the reference year, leaders with an unknown end year get no duration
+    end_year = pd.to_numeric(df['End Year'].mask(df['End Year'] == 'Incumbent', reference_year), errors='coerce')
+    start_year = pd.to_numeric(df['Start Year'], errors='coerce')
+    duration = pd.Series(np.trunc(np.trunc(end_year) - start_year), index=df.index).astype('Int64')
+
+    df['Country-A'] = df['Country']
+    df['Start Year'] = start_year.fillna(0).astype('int64')
+    df['Duration'] = duration.fillna(0).astype('int64')
+    df['Sizing'] = (duration ** 2).fillna(0).astype('int64')
+
+    # sort by country
+    df = df.sort_values(by=['Country', 'Country-A', 'Sequence'], ascending=[True, True, True])
+
+    return df[TERM_LIMITS_COLUMNS]
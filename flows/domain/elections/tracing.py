@@ -0,0 +1,138 @@
+# Opt-in timeline of the flow's Drive and S3 calls
+# With ELECTION_TRACE=1 (or the flow's trace parameter) every traced call is recorded as a span with its start, end,
+# thread and details (file ID or key, bytes, retries, status), and the run's spans are written as Chrome trace
+# JSON to <trace dir>/<run id>.trace.json, which chrome://tracing, Perfetto (ui.perfetto.dev) and speedscope open
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+TRACE_DIR = os.environ.get('ELECTION_TRACE_DIR', os.path.expanduser('~/.cache/election-traces'))
+TRACE_BY_DEFAULT = os.environ.get('ELECTION_TRACE', '0') == '1'
+
+settings = {
+    'enabled': TRACE_BY_DEFAULT,
+    'run_id': None,
+}
+
+
+class Tracer:
+    def __init__(self):
+        self.events = []
+        self.threads = {}  # thread id -> name, for the trace's thread labels
+        self.lock = threading.Lock()
+        self.local = threading.local()  # stack of the spans open in each thread
+        self.origin = time.perf_counter()
+
+    def clear(self):
+        with self.lock:
+            self.events = []
+            self.threads = {}
+        self.origin = time.perf_counter()
+
+    def open_spans(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def span(self, name, category, **args):
+        # yields the span's args, which the caller (or a governor call inside it) can add to before it closes
+        stack = self.open_spans()
+        stack.append(args)
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args['status'] = 'error'
+            args['error'] = f'{type(e).__name__}: {e}'
+            raise
+        else:
+            args.setdefault('status', 'ok')
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            self.record(name, category, start, end, args)
+
+    def annotate(self, **args):
+        # add details to the innermost open span of this thread, if any
+        stack = self.open_spans()
+        if stack:
+            stack[-1].update(args)
+
+    def record(self, name, category, start, end, args):
+        thread = threading.current_thread()
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',  # a complete event, with a start and a duration
+            'ts': round((start - self.origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': thread.ident,
+            'args': {key: value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+                     for key, value in args.items()},
+        }
+        with self.lock:
+            self.events.append(event)
+            self.threads[thread.ident] = thread.name
+
+    def chrome_trace(self, metadata=None):
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event['ts'])
+            threads = dict(self.threads)
+        thread_names = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+                        for tid, name in threads.items()]
+        return {'traceEvents': thread_names + events, 'displayTimeUnit': 'ms', 'otherData': metadata or {}}
+
+    def summary(self, limit=10):
+        # the slowest spans, to print at the end of a run
+        with self.lock:
+            events = sorted(self.events, key=lambda event: event['dur'], reverse=True)[:limit]
+        return [(event['name'], round(event['dur'] / 1000, 1), event['args']) for event in events]
+
+
+tracer = Tracer()
+
+
+def configure(enabled=None, run_id=None):
+    # called at the start of each run, a serve() process keeps these settings between runs
+    settings['enabled'] = TRACE_BY_DEFAULT if enabled is None else enabled
+    settings['run_id'] = str(run_id or datetime.now().strftime('%Y%m%dT%H%M%S'))
+    tracer.clear()
+
+
+def is_enabled():
+    return settings['enabled']
+
+
+@contextmanager
+def span(name, category, **args):
+    # a traced block, costs nothing but a dict while tracing is off
+    if not settings['enabled']:
+        yield args
+        return
+    with tracer.span(name, category, **args) as span_args:
+        yield span_args
+
+
+def annotate(**args):
+    if settings['enabled']:
+        tracer.annotate(**args)
+
+
+def export(path=None):
+    # write the run's spans as Chrome trace JSON and return the path, None when tracing is off
+    if not settings['enabled']:
+        return None
+    run_id = settings['run_id'] or datetime.now().strftime('%Y%m%dT%H%M%S')
+    path = path or os.path.join(TRACE_DIR, f'{run_id}.trace.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(tracer.chrome_trace({'run_id': run_id}), f)
+    print(f'Trace of {len(tracer.events)} spans written to {path}')
+    for name, milliseconds, args in tracer.summary():
+        print(f'{milliseconds:>10.1f} ms  {name} {args}')
+    return path
@@ -0,0 +1,366 @@
+# Stateless artifact transforms
+# Each function takes the input frames of one artifact family and returns the frame(s) that get published, without
+# module state or uploads, so every transform can be benchmarked and optimized on its own
+# (see benchmarks/bench_transforms.py). The generator tasks load the sheets, call these and publish the results
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from domain.elections.country_dimension import country_index, lookup, profile_order
+from domain.elections.key_stats import key_stats_csv_bodies
+from domain.elections.parliament_charts import parliament_charts
+from domain.elections.results_engine import META_COLUMNS, presidential_results_by_year, vote_shares
+from domain.elections.rollups import Rollup, merge_partials
+from domain.elections.term_limits import process_term_limits
+
+DEMOCRACY_INDEX_NOTE = ' &#9432; >>EIU Democracy Index, 2024<br><br>The index is based on five categories: electoral process and pluralism, functioning of government, political participation, political culture, and civil liberties. Based on its 0-10 scores on a range of indicators within these categories, each country is classified as one of four types of regime: “full democracy”, “flawed democracy”, “hybrid regime” or “authoritarian regime."'
+MONTH_NAMES = [('Jan', 'January'), ('Feb', 'February'), ('Mar', 'March'), ('Apr', 'April'), ('Jun', 'June'),
+               ('Jul', 'July'), ('Aug', 'August'), ('Sep', 'September'), ('Oct', 'October'), ('Nov', 'November'),
+               ('Dec', 'December')]
+REPRESENTATIVENESS_COLUMNS = {
+    'PVT: Was the winning party the same?': 'Did the results of the observation match the official results?',
+    'PVT: Would the discrepancy have changed who won the overall election results?': 'Was the deviation enough to have changed the winner?',
+    'PVT: For the winning party, what was the percentage point difference in vote share between PVT and official results?': 'How big was the deviation in % vote share for the winning party?'
+}
+
+
+def with_democracy_note(df, column):
+    # append the EIU index explanation to the democracy column's header
+    index = df.columns.get_loc(column)
+    df.columns = [col + DEMOCRACY_INDEX_NOTE if df.columns.get_loc(col) == index else col for col in df.columns]
+    return df
+
+
+# trackers
+
+def clean_date(date_value):
+    if isinstance(date_value, str):
+        date_value = date_value.replace('*', '')
+        for short, full in MONTH_NAMES:
+            date_value = date_value.replace(short, full)
+    return date_value
+
+
+def election_statuses(elections_df, today=None):
+    # elections with a Past/Upcoming/Neither Status, past ones latest first and the others soonest first
+    today = today or datetime.now()
+    elections_df = elections_df.copy()
+    date_new = pd.to_datetime(elections_df['Date'].apply(clean_date), errors='coerce')
+
+    def determine_status(date, parsed):
+        if pd.isna(date) or parsed.year > today.year + 1:
+            return 'Neither'
+        elif parsed.year < today.year or (parsed.year == today.year and parsed.month < today.month) or (parsed.year == today.year and parsed.month == today.month and parsed.day + 3 <= today.day):
+            return 'Past'
+        else:
+            return 'Upcoming'
+
+    elections_df['Status'] = [determine_status(date, parsed) for date, parsed in zip(elections_df['Date'], date_new)]
+    elections_df['Date_new'] = date_new
+
+    def sort_dates(status, group):
+        if status == 'Past':
+            return group.sort_values(by='Date_new', ascending=False)
+        return group.sort_values(by='Date_new', ascending=True, na_position='last')
+
+    # Neither, Past then Upcoming, each group sorted on its own
+    groups = [sort_dates(status, group) for status, group in elections_df.groupby('Status')]
+    if groups:
+        elections_df = pd.concat(groups).reset_index(drop=True)
+    return elections_df.drop(columns=['Date_new'])
+
+
+def description_with_link(description, link, link_text, empty_description):
+    # append the profile link to the description unless it is already there
+    description = str(description) if pd.notna(description) else empty_description
+    link = str(link) if pd.notna(link) else ''
+    if link and link not in description:
+        return f"{description} <br><br><a href='{link}'><b>{link_text} ➜</b></a>"
+    return description
+
+
+def placeholder_date(placeholder, date_value):
+    # placeholder dates only show the month, marked with a *
+    if placeholder == 'Yes' and date_value:
+        if isinstance(date_value, str):
+            date_value = datetime.strptime(date_value, '%d %b %Y')
+        return f"{date_value.strftime('%b %Y')}*"
+    return date_value
+
+
+def tracker_tables(elections_df, country_dimension_df):
+    # (upcoming tracker, past tracker) from elections that already have a Status
+    elections_table = pd.concat([elections_df, lookup(country_dimension_df, elections_df['Country'],
+                                                      ['Democracy', 'Stears URL'])], axis=1)
+
+    upcoming = elections_table[elections_table['Status'] == 'Upcoming'].copy()
+    upcoming['Description'] = [description_with_link(description, link, 'View profile', '-') for description, link
+                               in zip(upcoming['Description'], upcoming['Stears URL'])]
+    upcoming['Date'] = [placeholder_date(placeholder, date) for placeholder, date
+                        in zip(upcoming['Date (placeholder)'], upcoming['Date'])]
+    upcoming = upcoming[['Country', 'Type', 'Date', 'Democracy', 'Description']]
+    upcoming = upcoming.rename(columns={"Description": "What's at Stake", "Type": "Elections"})
+
+    past = elections_table[elections_table['Status'] == 'Past'].copy()
+    past['Description'] = [description_with_link(description, link, 'View results', '') for description, link
+                           in zip(past['Description'], past['Stears URL'])]
+    past = past[['Country', 'Type', 'Date', 'Democracy', 'Description']]
+    past = past.rename(columns={"Description": "Recap of significance and outcome", "Type": "Elections"})
+
+    return with_democracy_note(upcoming, 'Democracy'), with_democracy_note(past, 'Democracy')
+
+
+def upcoming_points(elections_df, countries_df, country_dimension_df):
+    # upcoming elections of profiled countries, in the order of the countries sheet
+    points = elections_df.iloc[profile_order(elections_df['Country'], countries_df['Country'])]
+    points = points.reset_index(drop=True)
+    points = pd.concat([points, lookup(country_dimension_df, points['Country'],
+                                       ['Longitude', 'Latitude', 'Stears URL'])], axis=1)
+    points = points.rename(columns={'Type': 'Elections', 'Stears URL': 'Profile'})
+    points['Type'] = np.where(points['Priority'] == 'Yes', 'Key race to watch', 'Other election')
+    return points[points['Status'] == 'Upcoming'][['Longitude', 'Latitude', 'Country', 'Type', 'Profile', 'Elections']]
+
+
+# africa maps
+
+def africa_map_tables(countries_df, country_dates_df, democracy_level_df, gdp_df, population_df):
+    # {map name: frame} for every africa-wide map and the democracy age table
+    countries_df = countries_df.copy()
+    for col in ['African Map Democracy Age', 'Years since first competitive election*',
+                'Age of current continuous democracy***']:
+        countries_df[col] = country_dates_df[col]
+
+    # uninterrupted democracy and competitive elections columns
+    countries_df['Uninterrupted democracy?**'] = np.where(countries_df['Years since first competitive election*'] == countries_df['Age of current continuous democracy***'], '✓ - Yes', 'No')
+    countries_df['Currently holding competitive elections?****'] = np.where(countries_df['Age of current continuous democracy***'] != '', '✓ - Yes', 'No')
+
+    # add info icon to countries with democracy age note
+    countries_df['Country name'] = [f"{country} &#9432; >>{note}" if pd.notna(note) else country for country, note
+                                    in zip(countries_df['Country'], countries_df['Democracy age note'])]
+
+    # countries that have never had an election return No for Currently holding competitive elections?
+    never_had_election = countries_df['Date that the first competitive democratic elections were held'].isin(['Never had an election', 'Null'])
+    countries_df.loc[never_had_election, 'Currently holding competitive elections?****'] = 'No'
+
+    africa_wide_democracy_age_df = countries_df[['Country name', 'Years since first competitive election*', 'Uninterrupted democracy?**', 'Age of current continuous democracy***', 'Currently holding competitive elections?****']]
+    africa_wide_democracy_age_df = africa_wide_democracy_age_df.sort_values(by='Country name').reset_index(drop=True)
+
+    return {
+        'Democracy_Level': democracy_level_df,
+        'Democracy_Age': countries_df[['Country', 'African Map Democracy Age']],
+        'GDP': gdp_df,
+        'Population': population_df,
+        'Coup': countries_df[['Country', 'State of Civilian Rule']],
+        'africa_wide_democracy_age': africa_wide_democracy_age_df
+    }
+
+
+# key stats
+
+def key_stats_table(countries_df, country_dates_df, population_df, country_dimension_df):
+    # one row per country of the population sheet with every key stat, bold headers
+    def format_system_of_government(row):
+        label = f"<b>{row['System of government label']}:</b>"
+        columns = ['Who runs the government?', 'How are they elected?', 'Regional govts have autonomy?', 'Legislature?']
+        bullet_points = [f"<li style='margin-left: 20px; margin-bottom: 2px;'>{row[col]}</li>" for col in columns if pd.notna(row[col])]
+
+        if bullet_points:
+            label += f"<ul style='margin-left: 20px; list-style-type: disc; padding-left: 20px;'>{''.join(bullet_points)}</ul>"
+        return label
+
+    # country profile columns derived from the countries sheet
+    countries_stats = country_index(pd.DataFrame({
+        'Country': countries_df['Country'],
+        'System of Government': countries_df.apply(format_system_of_government, axis=1),
+        'Key Stat Democracy Age': country_dates_df['Key Stat Democracy Age'],
+        'Age of Current President & Tenure': country_dates_df['President_age'].astype(str) + ' (' +
+                                             country_dates_df['President_tenure'].astype(str) + '-yrs)'
+    }))
+
+    # one row per country listed in the population sheet, every other column looked up by country
+    countries = population_df['Country'].reset_index(drop=True)
+    dimension = lookup(country_dimension_df, countries,
+                       ['Stears URL', 'Population', 'GDP', 'Democracy', 'State of Civilian Rule'])
+    profile = lookup(countries_stats, countries,
+                     ['System of Government', 'Key Stat Democracy Age', 'Age of Current President & Tenure'])
+    gdp = '$' + (dimension['GDP'] / 1000000000).round(1).astype(str) + 'bn'
+    population = (dimension['Population'] / 1000000).round(1).astype(str) + 'mn'
+
+    stats_table = pd.DataFrame({
+        'Country': countries,
+        'Stears URL': dimension['Stears URL'],
+        'Population': population.where(dimension['Population'].notna()),
+        'GDP': gdp.where(dimension['GDP'].notna()),
+        'System of Government': profile['System of Government'],
+        'Key Stat Democracy Age': profile['Key Stat Democracy Age'],
+        'Democracy': dimension['Democracy'],
+        'Age of Current President & Tenure': profile['Age of Current President & Tenure'],
+        'State of Civilian Rule': dimension['State of Civilian Rule']
+    })
+    stats_table = stats_table.rename(columns={
+        'Key Stat Democracy Age': 'Age of Democracy',
+        'Democracy': 'Democracy Level',
+        'State of Civilian Rule': 'Conflict/Coup Status'
+    })
+    stats_table.columns = [f'<b>{col}</b>' for col in stats_table.columns]  # adding bold tags to column names
+    return with_democracy_note(stats_table, '<b>Democracy Level</b>')
+
+
+def key_stats_tables(stats_table):
+    # {country: csv body} of the transposed Attribute/Value table for every country
+    return key_stats_csv_bodies(stats_table, '<b>Country</b>', drop_cols=['<b>Stears URL</b>'])
+
+
+# country workbooks
+
+def candidate_tables(candidate_df):
+    # [(year, frame)] with the candidates shown for each election year
+    cols_to_keep = ['Source', 'Name', 'Headshot URL', 'Birth Date', 'Gender', 'Party', 'Coalition', 'Year',
+                    'Previous Positions', 'Display', 'Winner']
+    candidate_df = candidate_df.loc[:, cols_to_keep]
+
+    split_positions = candidate_df['Previous Positions'].str.split(')', expand=True)
+    split_positions.fillna('', inplace=True)
+    new_previous_positions = split_positions.apply(lambda row: ')<br>'.join(row).rstrip(')<br>'), axis=1)
+    new_previous_positions = new_previous_positions.replace('\\n', '')
+    coalitions = candidate_df['Coalition'].replace('-', '')
+    candidate_df['Coalition'] = coalitions
+
+    texts = []
+    for gender, party, coalition, positions in zip(candidate_df['Gender'], candidate_df['Party'], coalitions,
+                                                   new_previous_positions):
+        text = ('<br><b>Gender: </b><span style="color: white;">' + gender + '</span> '
+                + '<br> <b>Party:</b> <span style="color: white;">' + party + '</span>')
+        if coalition:
+            text += '<br><b>Coalition:</b> <span style="color: white;">' + coalition + '</span>'
+        texts.append(text + '<br><br><b>Previous Government Positions:</b>'
+                     + '<br><span style="color: white;">' + positions + ')</span>')
+    candidate_df['Text'] = texts
+
+    tables = []
+    for year in candidate_df['Year'].unique():
+        candidate_year_df = candidate_df[candidate_df['Year'] == year].copy()
+        candidate_year_df['Name'] = [name + ' ✓' if winner == 'Yes' else name for name, winner
+                                     in zip(candidate_year_df['Name'], candidate_year_df['Winner'])]
+        # Only show candidates where Display is Yes
+        tables.append((year, candidate_year_df[candidate_year_df['Display'] == 'Yes']))
+    return tables
+
+
+def results_map_tables(results_maps_df):
+    # [(year, frame)] with the subnational results of each election year; vote counts were already filled with 0
+    # and stored as integers by the sheet's schema
+    results_maps_df = results_maps_df.iloc[:, 2:]
+    return [(year, results_maps_df[results_maps_df['Year'] == year].drop(columns=['Year']))
+            for year in results_maps_df['Year'].unique()]
+
+
+def bar_chart_tables(results_df):
+    # [(year, frame)] of vote shares, parties sorted by share with 'Other Parties' last
+    return presidential_results_by_year(results_df)
+
+
+def election_results_bar_chart_tables(results_df):
+    # [(year, frame)] of vote shares, parties kept in sheet order
+    return presidential_results_by_year(results_df, drop_columns=('Source', 'Year', 'Winning Party'),
+                                        order_parties=False)
+
+
+def parliament_chart_tables(legislative_df, label=None):
+    # [(year, chamber, frame)] of seats per coalition
+    return parliament_charts(legislative_df, label=label)
+
+
+def voter_metrics_table(voter_metrics_df):
+    # the first 14 columns, floats rounded to 2dp
+    voter_metrics_df = voter_metrics_df.iloc[:, 0:14].copy()
+    float_columns = voter_metrics_df.select_dtypes(include=['float64']).columns
+    voter_metrics_df[float_columns] = voter_metrics_df[float_columns].round(2)
+    return voter_metrics_df
+
+
+def election_resources_table(directory_df):
+    # observer groups as markdown links
+    directory_df = directory_df.iloc[:, :4].copy()
+    directory_df['Name'] = [f'[{name}]({website})' for name, website
+                            in zip(directory_df['Name'], directory_df['Website'])]
+    del directory_df['Website']
+    return directory_df
+
+
+def representativeness_year_tables(representativeness_df):
+    # [(year, frame)] with the PVT comparison of each election year
+    info_popup1 = ' ⓘ>>For the winning party, the percentage point difference in vote share between the PVT and official results was only '
+    info_popup2 = 'pp'
+    tables = []
+    for year in representativeness_df['Year'].unique():
+        year_df = representativeness_df[representativeness_df['Year'] == year].iloc[:, 4:7].copy()
+        year_df.columns = [
+            'Did the results of the observation match the official results?',
+            'PP difference',
+            'Was the deviation enough to have changed the winner?']
+
+        year_df.iloc[:, 0] = [
+            '<font size="+2">' + ' ✓ ' + value + '</font>' + info_popup1 + str(difference) + info_popup2
+            if value == 'Yes' else '<font size="+2">' + value + '</font>'
+            for value, difference in zip(year_df.iloc[:, 0], year_df['PP difference'])]
+        year_df.iloc[:, 2] = ['<font size="+2">' + value + '</font>' for value in year_df.iloc[:, 2]]
+        del year_df['PP difference']
+        tables.append((year, year_df))
+    return tables
+
+
+def representativeness_rows(representativeness_df):
+    # one country's rows of the africa-wide representativeness table
+    df = representativeness_df.rename(columns=REPRESENTATIVENESS_COLUMNS)
+    match = 'Did the results of the observation match the official results?'
+    deviation = 'How big was the deviation in % vote share for the winning party?'
+    df[match] = ['✓ Yes' if value == 'Yes' else 'No' for value in df[match]]
+    df[deviation] = [f"{value}pp" for value in df[deviation]]
+    df['More details'] = [f'View full reports from <a href="{source}">{group}</a>' for source, group
+                          in zip(df['Source'], df['Observer Group'])]
+    return df[['Country', 'Year', match, 'Was the deviation enough to have changed the winner?', deviation,
+               'More details']]
+
+
+def representativeness_rollup(country_rows):
+    # every country's rows, latest election year first
+    return merge_partials(country_rows, REPRESENTATIVENESS_ROLLUP)
+
+
+def voter_metrics_rows(voter_metrics_df, country_name):
+    # one country's rows of the africa-wide voter metrics table
+    df = voter_metrics_table(voter_metrics_df)
+    if 'Country' not in df.columns:
+        df.insert(0, 'Country', country_name.replace('-', ' ').title())
+    return df
+
+
+def results_rows(results_df):
+    # one country's rows of the africa-wide presidential results table: total votes and the winner's share per year
+    party_columns = list(results_df.columns[META_COLUMNS:])
+    votes = results_df.iloc[:, META_COLUMNS:].to_numpy(dtype='float64', na_value=np.nan)
+    shares = vote_shares(votes)
+    winners = results_df['Winning Party'].astype(object).tolist()
+    return pd.DataFrame({
+        'Country': results_df.iloc[:, 1].astype(object).to_numpy(),
+        'Year': results_df['Year'].to_numpy(),
+        'Winning Party': winners,
+        'Total votes': np.nansum(votes, axis=1).astype('int64'),
+        'Winning party vote share (%)': [shares[row, party_columns.index(winner)] if winner in party_columns
+                                         else np.nan for row, winner in enumerate(winners)],
+    })
+
+
+# continent-wide rollups, maintained from per-country partials (see rollups.py)
+REPRESENTATIVENESS_ROLLUP = Rollup('representativeness', 'election-representativeness.csv', 'representativeness',
+                                   'Election-Representativeness', lambda df, country: representativeness_rows(df))
+VOTER_METRICS_ROLLUP = Rollup('voter-metrics', 'voter-metrics.csv', 'voter-metrics', 'Voter-Metrics',
+                              voter_metrics_rows)
+RESULTS_ROLLUP = Rollup('results', 'presidential-results.csv', 'bar-charts', 'Pres-Results-Total',
+                        lambda df, country: results_rows(df))
+
+
+def term_limits_table(term_limits_df, reference_year=None):
+    return process_term_limits(term_limits_df, reference_year=reference_year)
@@ -1,8 +1,8 @@
 from prefect import serve
-from domain.elections.refresh_election_data import refresh_election_data_deployment
+from domain.elections.refresh_election_data import refresh_election_data_deployments
 
 if __name__ == "__main__":
     serve(
-        refresh_election_data_deployment,
+        *refresh_election_data_deployments,
         pause_on_shutdown=False
     )
@@ -0,0 +1,9 @@
+# Tests run from flows/ (python -m pytest) and import the flow's packages the way the flow does
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: times a transform against an optional saved baseline')
@@ -0,0 +1,32 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.bench_transforms import SIZES, cases, measure, regressions
+
+# Every transform benchmark as a test: by default each one runs at the small size and only has to complete, given
+# ELECTION_BENCH_BASELINE (a JSON written by python -m benchmarks.bench_transforms --save) a transform fails when its
+# best time grew by more than ELECTION_BENCH_THRESHOLD over the baseline's. Deselect with -m "not benchmark"
+BENCH_SIZE = os.environ.get('ELECTION_BENCH_SIZE', 'small')
+BENCH_ROUNDS = int(os.environ.get('ELECTION_BENCH_ROUNDS', '3'))
+BENCH_BASELINE = os.environ.get('ELECTION_BENCH_BASELINE')
+BENCH_THRESHOLD = float(os.environ.get('ELECTION_BENCH_THRESHOLD', '0.2'))
+CASES = cases(SIZES[BENCH_SIZE])
+
+
+@pytest.fixture(scope='module')
+def baseline():
+    if not BENCH_BASELINE:
+        return {}
+    with open(BENCH_BASELINE) as f:
+        return json.load(f)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('name, fn', CASES, ids=[name for name, _ in CASES])
+def test_transform_is_not_slower_than_baseline(baseline, name, fn):
+    best, median = measure(fn, BENCH_ROUNDS)
+    print(f'{name}[{BENCH_SIZE}] best {best * 1000:.3f} ms, median {median * 1000:.3f} ms')
+    slower = regressions({f'{name}[{BENCH_SIZE}]': {'min': best, 'median': median}}, baseline, BENCH_THRESHOLD)
+    assert not slower, [f'{key}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms' for key, before, after in slower]
@@ -0,0 +1,49 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from domain.elections.bundles import CountryBundles
+
+
+def year_slice(year, rows=2000):
+    # one election year of a subnational results sheet
+    rng = np.random.default_rng(year)
+    return pd.DataFrame({'Region': [f'Ward {i}' for i in range(rows)],
+                         **{f'Party {p}': rng.integers(0, 5000, rows) for p in range(8)}})
+
+
+def peak_bytes(family, years):
+    # peak traced memory while the years are published one at a time and added to the bundles
+    bundles = CountryBundles()
+    tracemalloc.start()
+    try:
+        for year in years:
+            df = year_slice(year)
+            csv_body = df.to_csv(index=False).encode('utf-8')
+            bundles.add('ghana', family, year, f'ghana-map-{year}.csv', df, csv_body,
+                        url=f'https://bucket.s3.amazonaws.com/ghana-map-{year}.csv')
+            del df, csv_body
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_results_maps_parts_are_references():
+    bundles = CountryBundles()
+    df = year_slice(2020, rows=10)
+    bundles.add('Ghana', 'results-maps', 2020, 'ghana-map-2020.csv', df, b'csv',
+                url='https://bucket.s3.amazonaws.com/ghana-map-2020.csv')
+    bundle = bundles.build('ghana')
+    assert bundle['parts'] == {'results-maps': {'2020': {
+        'ghana-map-2020.csv': {'url': 'https://bucket.s3.amazonaws.com/ghana-map-2020.csv'}}}}
+    assert 'ghana-map-2020.csv' in bundle['hashes']
+
+
+def test_results_maps_peak_memory_is_one_year():
+    # streaming the sheet by year only helps if the bundles don't keep every year
+    one_year = peak_bytes('results-maps', range(2000, 2002))
+    many_years = peak_bytes('results-maps', range(2000, 2024))
+    assert many_years < 1.25 * one_year
+    # a family whose tables are kept grows with every year
+    assert peak_bytes('candidates', range(2000, 2010)) > 3 * one_year
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from domain.elections.schemas import SCHEMAS, SchemaDriftError, apply_schemas
+from domain.elections.subnational import SUBNATIONAL_SHEET, SubnationalStore
+
+
+def subnational(**party_columns):
+    df = pd.DataFrame({'Source': 's', 'Country': 'Ghana', 'Year': [2016, 2016, 2020, 2020],
+                       'Region': ['Ashanti', 'Volta', 'Ashanti', 'Volta']})
+    for party, votes in party_columns.items():
+        df[party] = votes
+    return df
+
+
+def test_vote_counts_become_compact_integers():
+    df = SCHEMAS[SUBNATIONAL_SHEET].apply(subnational(**{'Party A': [1200.0, np.nan, 3400.0, 56.0],
+                                                         'Party B': [70000, 1, 2, 3]}))
+    assert df['Party A'].tolist() == [1200, 0, 3400, 56]
+    assert df['Party A'].dtype == 'int16'
+    assert df['Party B'].dtype == 'int32'
+    assert df['Region'].tolist() == ['Ashanti', 'Volta', 'Ashanti', 'Volta']
+
+
+def test_fractional_vote_columns_are_drift_not_truncated():
+    df = subnational(**{'Party A': [1200.0, np.nan, 3400.0, 56.0], 'Turnout (%)': [61.5, 70.0, 58.25, 64.0]})
+    with pytest.raises(SchemaDriftError, match=r"\['Turnout \(%\)'\]"):
+        SCHEMAS[SUBNATIONAL_SHEET].apply(df, label='ghana')
+    # a country workbook only loses the drifted sheet
+    assert SUBNATIONAL_SHEET not in apply_schemas({SUBNATIONAL_SHEET: df}, label='ghana', strict=False)
+
+
+def test_streamed_years_stop_at_the_first_fractional_year(tmp_path):
+    source = tmp_path / 'ghana.xlsx'
+    subnational(**{'Party A': [1200, 3, 3400.5, 56]}).to_excel(source, sheet_name=SUBNATIONAL_SHEET, index=False)
+    store = SubnationalStore(root=str(tmp_path / 'spool'))
+    store.save('ghana', 'abc', str(source), label='ghana')
+    years = store.years('ghana', 'abc', label='ghana')
+    assert next(years)['Party A'].tolist() == [1200, 3]
+    with pytest.raises(SchemaDriftError, match='ghana'):
+        next(years)
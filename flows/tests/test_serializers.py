@@ -0,0 +1,46 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from domain.elections.publisher import ARTIFACT_FAMILIES
+from domain.elections.serializers import UnsupportedFrame, fast_csv_bytes, to_csv_bytes
+
+# Frames the pipeline published, one directory per artifact family, each stored with what to_csv wrote for it
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'csv')
+FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*', '*.pkl')))
+
+
+def fixture_id(path):
+    return os.path.relpath(path, FIXTURES_DIR)[:-len('.pkl')]
+
+
+def load_fixture(path):
+    with open(path[:-len('.pkl')] + '.csv', 'rb') as f:
+        return pd.read_pickle(path), f.read()
+
+
+def test_every_family_has_golden_artifacts():
+    families = {os.path.basename(os.path.dirname(path)) for path in FIXTURES}
+    assert sorted(families) == sorted(ARTIFACT_FAMILIES)
+
+
+@pytest.mark.parametrize('path', FIXTURES, ids=fixture_id)
+def test_fast_writer_matches_to_csv(path):
+    df, expected = load_fixture(path)
+    try:
+        assert fast_csv_bytes(df) == expected
+    except UnsupportedFrame:
+        pass  # to_csv_bytes hands these to pandas, checked below
+    assert to_csv_bytes(df, serializer='fast') == expected
+
+
+def test_fast_writer_matches_to_csv_on_edge_cases():
+    # the benchmark's artifacts add quoting, unicode, newlines and missing values of every dtype
+    from benchmarks.bench_serializers import family_artifacts
+
+    for family, artifacts in family_artifacts().items():
+        for df, header in artifacts:
+            expected = df.to_csv(index=False, header=header).encode('utf-8')
+            assert to_csv_bytes(df, header=header, serializer='fast') == expected, family
@@ -0,0 +1,155 @@
+import glob
+import io
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from domain.elections import transforms
+from domain.elections.country_dimension import build_country_dimension
+from domain.elections.date_derivations import derive_country_dates
+from domain.elections.schemas import apply_schemas
+
+# Workbooks the flow reads (master sheets, the term limits and observer directory sheets and two country workbooks)
+# and, for each artifact, what the generators published from them before the transforms were pulled out of them,
+# with the clock at REFERENCE_DATE
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'transforms')
+EXPECTED = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'expected', '*.csv')))
+REFERENCE_DATE = datetime(2026, 6, 15)
+COUNTRIES = ['ghana', 'kenya']
+# rollups keep the countries' order among rows of the same year (rollups.merge_partials), the baseline's sort left
+# that order unspecified, so only their rows are compared
+ROLLUPS = ['election-representativeness.csv']
+MAP_NAMES = {
+    'Democracy_Level': 'africa-map-democracy-level.csv',
+    'Democracy_Age': 'africa-map-democracy-age.csv',
+    'GDP': 'africa-map-gdp.csv',
+    'Population': 'africa-map-population.csv',
+    'Coup': 'africa-map-coup.csv',
+    'africa_wide_democracy_age': 'africa-wide-democracy-age.csv',
+}
+
+
+def csv_bytes(df):
+    return df.to_csv(index=False).encode()
+
+
+def sorted_rows(body):
+    df = pd.read_csv(io.BytesIO(body))
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def load_workbooks():
+    workbooks = pd.read_pickle(os.path.join(FIXTURES_DIR, 'workbooks.pkl'))
+    return {label: apply_schemas({name: df.copy() for name, df in sheets.items()}, label=label,
+                                 strict=label not in COUNTRIES)
+            for label, sheets in workbooks.items()}
+
+
+def country_artifacts(country_name, spreadsheet):
+    # what the country generators publish for one workbook, by key
+    artifacts = {}
+    for year, df in transforms.candidate_tables(spreadsheet['Candidates']):
+        artifacts[f'{country_name}-candidates-{year}.csv'] = csv_bytes(df)
+    for year, df in transforms.bar_chart_tables(spreadsheet['Pres-Results-Total']):
+        artifacts[f'{country_name}-bar-{year}.csv'] = csv_bytes(df)
+    if 'Pres-Election-Results' in spreadsheet:
+        for year, df in transforms.election_results_bar_chart_tables(spreadsheet['Pres-Election-Results']):
+            artifacts[f'{country_name}-bar-{year}-Pres-Election-Results.csv'] = csv_bytes(df)
+    for year, df in transforms.results_map_tables(spreadsheet['Pres-Results-Subnational']):
+        artifacts[f'{country_name}-map-{year}.csv'] = csv_bytes(df)
+    for year, p_type, df in transforms.parliament_chart_tables(spreadsheet['Legislative-Control'], label=country_name):
+        artifacts[f'{country_name}-{p_type.lower()}-parliament-charts-{year}.csv'] = csv_bytes(df)
+    artifacts[f'{country_name}-voter-metrics.csv'] = csv_bytes(transforms.voter_metrics_table(
+        spreadsheet['Voter-Metrics']))
+    for year, df in transforms.representativeness_year_tables(spreadsheet['Election-Representativeness']):
+        artifacts[f'{country_name}-election-representativeness-{year}.csv'] = csv_bytes(df)
+    return artifacts
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    # {key: csv body} of every artifact the baseline published, rebuilt from the transforms
+    workbooks = load_workbooks()
+    master = workbooks['africa-level']
+    countries_df = master['countries']
+    country_dates = derive_country_dates(countries_df, reference_date=REFERENCE_DATE)
+    dimension = build_country_dimension(countries_df, master['population'], master['gdp'], master['democracy_level'])
+    elections = transforms.election_statuses(master['elections'], today=REFERENCE_DATE)
+
+    upcoming, past = transforms.tracker_tables(elections, dimension)
+    artifacts = {
+        'africa-upcoming-tracker.csv': csv_bytes(upcoming),
+        'africa-past-tracker.csv': csv_bytes(past),
+        'africa-upcoming-points.csv': csv_bytes(transforms.upcoming_points(elections, countries_df, dimension)),
+        'election_resources.csv': csv_bytes(transforms.election_resources_table(
+            workbooks['election-observer-directory']['Directory'])),
+        'term_limits.csv': csv_bytes(transforms.term_limits_table(workbooks['term-limits']['Term_limits'],
+                                                                  reference_year=REFERENCE_DATE.year)),
+    }
+    maps = transforms.africa_map_tables(countries_df, country_dates, master['democracy_level'], master['gdp'],
+                                        master['population'])
+    artifacts.update({MAP_NAMES[name]: csv_bytes(df) for name, df in maps.items()})
+    stats_table = transforms.key_stats_table(countries_df, country_dates, master['population'], dimension)
+    for country, csv_body in transforms.key_stats_tables(stats_table).items():
+        artifacts[f'{country.lower().replace(" ", "-")}-key-stats.csv'] = csv_body.encode()
+
+    for country_name in COUNTRIES:
+        artifacts.update(country_artifacts(country_name, workbooks[country_name]))
+    artifacts['election-representativeness.csv'] = csv_bytes(transforms.representativeness_rollup(
+        [transforms.representativeness_rows(workbooks[country_name]['Election-Representativeness'])
+         for country_name in COUNTRIES]))
+    return artifacts
+
+
+def test_every_baseline_artifact_is_rebuilt(artifacts):
+    assert sorted(artifacts) == sorted(os.path.basename(path) for path in EXPECTED)
+
+
+@pytest.mark.parametrize('path', EXPECTED, ids=os.path.basename)
+def test_transform_matches_baseline(artifacts, path):
+    key = os.path.basename(path)
+    with open(path, 'rb') as f:
+        expected = f.read()
+    if key in ROLLUPS:
+        pd.testing.assert_frame_equal(sorted_rows(artifacts[key]), sorted_rows(expected))
+    else:
+        assert artifacts[key] == expected
+
+
+def test_election_statuses_past_once_three_days_have_gone():
+    elections = pd.DataFrame({'Country': ['A', 'B', 'C', 'D', 'E'],
+                              'Date': ['12 Jun 2026', '13 Jun 2026', '15 Jun 2027', '1 Jan 2028', None]})
+    statuses = transforms.election_statuses(elections, today=REFERENCE_DATE)
+    assert dict(zip(statuses['Country'], statuses['Status'])) == {
+        'A': 'Past', 'B': 'Upcoming', 'C': 'Upcoming', 'D': 'Neither', 'E': 'Neither'}
+    # Neither, Past then Upcoming, upcoming ones soonest first
+    assert list(statuses['Country']) == ['D', 'E', 'A', 'B', 'C']
+
+
+def test_placeholder_dates_only_show_the_month():
+    assert transforms.placeholder_date('Yes', '7 Dec 2026') == 'Dec 2026*'
+    assert transforms.placeholder_date('No', '7 Dec 2026') == '7 Dec 2026'
+    assert transforms.clean_date('7 Dec 2026*') == '7 December 2026'
+
+
+def test_description_links_the_profile_once():
+    link = 'https://stears.co/ghana'
+    assert transforms.description_with_link(None, link, 'View profile', '-') == \
+        f"- <br><br><a href='{link}'><b>View profile ➜</b></a>"
+    assert transforms.description_with_link(f'See {link}', link, 'View profile', '-') == f'See {link}'
+    assert transforms.description_with_link('A close race', None, 'View profile', '-') == 'A close race'
+
+
+def test_representativeness_rollup_is_latest_year_first():
+    rows = [transforms.representativeness_rows(pd.DataFrame({
+        'Country': country, 'Year': years, 'Source': 'https://report', 'Observer Group': 'CODEO',
+        'PVT: Was the winning party the same?': 'Yes',
+        'PVT: For the winning party, what was the percentage point difference in vote share between PVT and '
+        'official results?': 0.5,
+        'PVT: Would the discrepancy have changed who won the overall election results?': 'No'}))
+        for country, years in [('Ghana', [2016, 2020]), ('Kenya', [2022])]]
+    rollup = transforms.representativeness_rollup(rows)
+    assert list(zip(rollup['Country'], rollup['Year'])) == [('Kenya', 2022), ('Ghana', 2020), ('Ghana', 2016)]
+    assert rollup['How big was the deviation in % vote share for the winning party?'].tolist() == ['0.5pp'] * 3